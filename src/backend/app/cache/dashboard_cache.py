@@ -1,17 +1,17 @@
 # src/backend/app/cache/dashboard_cache.py
 import json
-from ..services.redis_service import redis_client
+from ..services.redis_service import get_redis
 
 DASHBOARD_TTL = 30  # seconds
 
 def get_dashboard_cache():
-    data = redis_client.get("dashboard")
+    data = get_redis().get("dashboard")
     if data:
         return json.loads(data)
     return None
 
 def set_dashboard_cache(payload):
-    redis_client.set("dashboard", json.dumps(payload), ex=DASHBOARD_TTL)
+    get_redis().set("dashboard", json.dumps(payload), ex=DASHBOARD_TTL)
 
 def clear_dashboard_cache():
-    redis_client.delete("dashboard")
+    get_redis().delete("dashboard")
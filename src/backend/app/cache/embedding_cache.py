@@ -1,6 +1,6 @@
 import hashlib
 import json
-from ..services.redis_service import redis_client
+from ..services.redis_service import get_redis
 
 EMBEDDING_TTL = 60 * 60 * 24  # 24 hours
 
@@ -9,11 +9,11 @@ def compute_hash(image_bytes: bytes):
 
 def get_cached_embedding(image_bytes: bytes):
     key = f"embed:{compute_hash(image_bytes)}"
-    data = redis_client.get(key)
+    data = get_redis().get(key)
     if data:
         return json.loads(data)
     return None
 
 def set_cached_embedding(image_bytes: bytes, embedding):
     key = f"embed:{compute_hash(image_bytes)}"
-    redis_client.set(key, json.dumps(embedding), ex=EMBEDDING_TTL)
+    get_redis().set(key, json.dumps(embedding), ex=EMBEDDING_TTL)
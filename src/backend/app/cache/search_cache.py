@@ -1,20 +1,31 @@
 import hashlib
 import json
-from ..services.redis_service import redis_client
+from ..services.redis_service import get_redis
 
 SEARCH_TTL = 60 * 60 * 3  # 3 hours
+VERSION_KEY = "search:version"
 
 def hash_embedding(embedding):
     e = ",".join([f"{x:.5f}" for x in embedding])
     return hashlib.sha256(e.encode()).hexdigest()
 
-def get_cached_search(embedding):
-    key = f"search:{hash_embedding(embedding)}"
-    cached = redis_client.get(key)
+def search_cache_key(embedding, filters=None):
+    # the version is bumped whenever a person's searchable data changes, which
+    # orphans every cached result at once (they expire through SEARCH_TTL)
+    version = int(get_redis().get(VERSION_KEY) or 0)
+    key = f"search:v{version}:{hash_embedding(embedding)}"
+    if filters:
+        key += ":" + hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:16]
+    return key
+
+def get_cached_search(key):
+    cached = get_redis().get(key)
     if cached:
         return json.loads(cached)
     return None
 
-def set_cached_search(embedding, results):
-    key = f"search:{hash_embedding(embedding)}"
-    redis_client.set(key, json.dumps(results), ex=SEARCH_TTL)
+def set_cached_search(key, results):
+    get_redis().set(key, json.dumps(results), ex=SEARCH_TTL)
+
+def invalidate_search_cache():
+    get_redis().incr(VERSION_KEY)
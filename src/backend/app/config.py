@@ -10,6 +10,44 @@ CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_GRPC = os.getenv("QDRANT_GRPC", "false").lower() == "true"  # gRPC transport instead of REST
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))  # seconds per request
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "20"))  # kept-alive REST connections
+
+# Collection layout, applied by pipelines/make_qdrant_collection.py
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")  # none | scalar (int8) | binary
+QDRANT_QUANTIZATION_ALWAYS_RAM = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+QDRANT_SCALAR_QUANTILE = float(os.getenv("QDRANT_SCALAR_QUANTILE", "0.99"))  # clips outliers before int8
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"  # float32 originals on disk
+
+# Search-time parameters (0 / empty leaves Qdrant's default)
+QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "0"))
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "0"))  # e.g. 2.0 fetches 2x candidates from the quantized index
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"  # re-rank candidates with the originals
+
+# Face gallery backend: "qdrant" or "local" (in-process memory-mapped NumPy
+# index, no network hop; also the offline test/bench backend)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant")
+LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", "data/vector_store")
+LOCAL_STORE_INDEX = os.getenv("LOCAL_STORE_INDEX", "flat")  # flat (exact) | ivf
+LOCAL_STORE_NLIST = int(os.getenv("LOCAL_STORE_NLIST", "1024"))  # IVF lists
+LOCAL_STORE_NPROBE = int(os.getenv("LOCAL_STORE_NPROBE", "16"))  # IVF lists scanned per query
+
+# A person can have several face points; grouped search keeps the best per
+# person. Backends without native grouping fetch top_k x this and dedupe.
+GROUP_OVERFETCH = int(os.getenv("GROUP_OVERFETCH", "4"))
+
+# Gallery writes (services/bulk_writer.py): points per upsert request, batches
+# in flight at once, retries per batch with exponential backoff from
+# UPSERT_BACKOFF seconds, and whether bulk writes wait for indexing
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+UPSERT_PARALLEL = int(os.getenv("UPSERT_PARALLEL", "4"))
+UPSERT_RETRIES = int(os.getenv("UPSERT_RETRIES", "3"))
+UPSERT_BACKOFF = float(os.getenv("UPSERT_BACKOFF", "0.5"))
+UPSERT_WAIT = os.getenv("UPSERT_WAIT", "false").lower() == "true"
 
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "admin-token")
 SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.3"))  # 0..1
@@ -19,6 +57,121 @@ TOP_K = int(os.getenv("TOP_K", "5"))
 BUFFALO_ONNX  = os.getenv("ARCFACE_ONNX", "src/backend/models/glintr100.onnx")
 SCRFD_ONNX = os.getenv("SCRFD_ONNX", "src/backend/models/SCRFD.onnx")  # optional
 
+# ONNX Runtime session options, per model (env prefix SCRFD_ / ARCFACE_).
+# Thread counts of 0 leave the choice to ONNX Runtime; with several uvicorn
+# workers per box, set them so workers x threads <= cores.
+def _ort_settings(prefix):
+    def flag(name, default):
+        return os.getenv(f"{prefix}_{name}", default).lower() == "true"
+
+    return {
+        "intra_op_num_threads": int(os.getenv(f"{prefix}_INTRA_OP_THREADS", "0")),
+        "inter_op_num_threads": int(os.getenv(f"{prefix}_INTER_OP_THREADS", "0")),
+        "execution_mode": os.getenv(f"{prefix}_EXECUTION_MODE", "sequential"),  # sequential | parallel
+        "graph_optimization_level": os.getenv(f"{prefix}_GRAPH_OPT_LEVEL", "all"),  # disable | basic | extended | all
+        "enable_cpu_mem_arena": flag("ENABLE_MEM_ARENA", "false" if os.getenv("ORT_DISABLE_MEMORY_ARENA") == "1" else "true"),
+        "enable_mem_pattern": flag("ENABLE_MEM_PATTERN", "true"),
+        "allow_spinning": flag("ALLOW_SPINNING", "true"),
+    }
+
+SCRFD_ORT_SETTINGS = _ort_settings("SCRFD")
+ARCFACE_ORT_SETTINGS = _ort_settings("ARCFACE")
+
+# Detector input resolution policy (sizes must be multiples of 32)
+DETECTOR_INPUT_SIZES = [int(s) for s in os.getenv("DETECTOR_INPUT_SIZES", "320,480,640,960").split(",")]
+# smallest face / longest image side; 0.05 keeps 640 for anything larger than 480
+DETECTOR_MIN_FACE_RATIO = float(os.getenv("DETECTOR_MIN_FACE_RATIO", "0.05"))
+
+# Detector NMS: "hard" (OpenCV), "numpy" (greedy NumPy loop, stops at NMS_MAX_DET) or "soft" (gaussian soft-NMS)
+NMS_METHOD = os.getenv("NMS_METHOD", "hard")
+NMS_PRE_TOP_K = int(os.getenv("NMS_PRE_TOP_K", "1000"))  # candidates considered, 0 = all
+NMS_MAX_DET = int(os.getenv("NMS_MAX_DET", "100"))  # faces kept per image, 0 = all
+NMS_SOFT_SIGMA = float(os.getenv("NMS_SOFT_SIGMA", "0.5"))
+
+# Coarse-to-fine detection: detect on a thumbnail, crop the face from the full image
+COARSE_TO_FINE = os.getenv("COARSE_TO_FINE", "true").lower() == "true"
+COARSE_MAX_SIDE = int(os.getenv("COARSE_MAX_SIDE", "640"))  # thumbnail longest side
+COARSE_MARGIN = float(os.getenv("COARSE_MARGIN", "0.25"))  # margin around the coarse box, fraction of box size
+
+# Oversized JPEG uploads are decoded at 1/2, 1/4 or 1/8 scale (longest side
+# kept >= REDUCED_DECODE_MIN_SIDE). The full-resolution image is only decoded
+# when the face found in the reduced one is smaller than REDUCED_DECODE_MIN_FACE_PX.
+REDUCED_DECODE = os.getenv("REDUCED_DECODE", "true").lower() == "true"
+REDUCED_DECODE_MIN_SIDE = int(os.getenv("REDUCED_DECODE_MIN_SIDE", "640"))
+REDUCED_DECODE_MIN_FACE_PX = int(os.getenv("REDUCED_DECODE_MIN_FACE_PX", "128"))
+
+# Warp detected faces to the ArcFace template from SCRFD landmarks instead of
+# resizing the box crop (rebuild the gallery after changing this)
+FACE_ALIGNMENT = os.getenv("FACE_ALIGNMENT", "true").lower() == "true"
+
+# Multi-face /search (group photos): every face above the score is searched
+MULTI_FACE_MIN_SCORE = float(os.getenv("MULTI_FACE_MIN_SCORE", "0.5"))
+MULTI_FACE_MAX_FACES = int(os.getenv("MULTI_FACE_MAX_FACES", "20"))
+MULTI_FACE_MIN_FACE_RATIO = float(os.getenv("MULTI_FACE_MIN_FACE_RATIO", "0.03"))  # group shots have small faces
+
+# Video / frame-stream search (/search/video)
+VIDEO_SAMPLE_FPS = float(os.getenv("VIDEO_SAMPLE_FPS", "2"))  # frames looked at per second of footage
+VIDEO_MIN_SAMPLE_FPS = float(os.getenv("VIDEO_MIN_SAMPLE_FPS", "0.5"))  # static scene, nobody tracked
+VIDEO_MAX_SAMPLE_FPS = float(os.getenv("VIDEO_MAX_SAMPLE_FPS", "6"))  # while faces are being tracked
+VIDEO_MOTION_THRESHOLD = float(os.getenv("VIDEO_MOTION_THRESHOLD", "3.0"))  # mean abs pixel change between samples
+VIDEO_MJPEG_FPS = float(os.getenv("VIDEO_MJPEG_FPS", "10"))  # assumed rate of uploaded JPEG frame streams
+VIDEO_DETECT_BATCH = int(os.getenv("VIDEO_DETECT_BATCH", "8"))  # sampled frames per SCRFD call
+VIDEO_MIN_SCORE = float(os.getenv("VIDEO_MIN_SCORE", "0.5"))
+VIDEO_TRACK_IOU = float(os.getenv("VIDEO_TRACK_IOU", "0.3"))
+VIDEO_TRACK_MAX_AGE = int(os.getenv("VIDEO_TRACK_MAX_AGE", "4"))  # sampled frames a track may go unseen
+VIDEO_EMBEDS_PER_TRACK = int(os.getenv("VIDEO_EMBEDS_PER_TRACK", "3"))
+VIDEO_MAX_SECONDS = float(os.getenv("VIDEO_MAX_SECONDS", "1800"))
+
+# Pre-inference quality gate, one profile per endpoint. Uploads whose face is
+# too small, blurry, dark/overexposed or weakly detected are rejected before
+# ArcFace runs. Sharpness is the Laplacian variance of the face resized to 112x112.
+def _quality_settings(prefix, enabled, min_face_px, min_sharpness, min_score):
+    return {
+        "enabled": os.getenv(f"{prefix}_QUALITY_GATE", enabled).lower() == "true",
+        "min_face_px": int(os.getenv(f"{prefix}_MIN_FACE_PX", min_face_px)),
+        "min_sharpness": float(os.getenv(f"{prefix}_MIN_SHARPNESS", min_sharpness)),
+        "min_brightness": float(os.getenv(f"{prefix}_MIN_BRIGHTNESS", "40")),
+        "max_brightness": float(os.getenv(f"{prefix}_MAX_BRIGHTNESS", "225")),
+        "min_det_score": float(os.getenv(f"{prefix}_MIN_DET_SCORE", min_score)),
+    }
+
+QUALITY_PROFILES = {
+    "search": _quality_settings("SEARCH", "true", "40", "20", "0.5"),
+    "register": _quality_settings("REGISTER", "true", "64", "40", "0.6"),
+}
+
+# Load the ONNX models in the background right after startup instead of on the
+# first request; the port opens either way
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# Where CPU-bound request work runs: "thread", "process" (workers preload the
+# models) or "inline" (on the event loop, for before/after benchmarks)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+# Shared inference server: when set, API workers send images to the process
+# listening on this Unix socket instead of loading the models themselves
+INFERENCE_SERVER_SOCKET = os.getenv("INFERENCE_SERVER_SOCKET", "")
+
+# Micro-batching of concurrent /search inference
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "8"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5"))
+
+# Staged (pipeline-parallel) inference: decode -> detect -> align -> embed run
+# as separate stages with their own workers and bounded queues in between.
+# Used by bulk jobs, and by /search when STAGED_PIPELINE is on (with the
+# vector search as a final stage).
+STAGED_PIPELINE = os.getenv("STAGED_PIPELINE", "false").lower() == "true"
+STAGE_WORKERS = {
+    name: int(count)
+    for name, count in (
+        part.split("=") for part in os.getenv("STAGE_WORKERS", "decode=2,detect=2,align=1,embed=1,search=2").split(",")
+    )
+}
+STAGE_BATCH_SIZE = int(os.getenv("STAGE_BATCH_SIZE", "8"))  # max items per detect/embed model call
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "32"))  # items waiting in front of each stage
+
 CLERK_ISSUER = os.getenv("CLERK_ISSUER")  
 CLERK_AUD = os.getenv("CLERK_AUD")
 
@@ -1,7 +1,11 @@
 # src/backend/app/main.py
+import asyncio
 from fastapi import FastAPI
 from .routers import search, register, admin
 from .services.db_service import create_tables
+from .services.executor import warmup_backend
+from .services.vector_store import get_vector_store
+from .config import WARMUP_ON_STARTUP
 from fastapi.middleware.cors import CORSMiddleware
 
 origins = [
@@ -16,6 +20,9 @@ origins = [
 
 app = FastAPI(title="ReUniteAI API")
 
+# strong references to fire-and-forget startup tasks (the loop keeps weak ones)
+_background_tasks = set()
+
 app.include_router(search.router)
 app.include_router(register.router)
 app.include_router(admin.router)
@@ -29,6 +36,23 @@ app.add_middleware(
 )
 
 
+def _warmup_done(task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        # requests will still load the models on demand (or fail the same way)
+        print(f"❌ Model warm-up failed: {task.exception()!r}")
+
+
 @app.on_event("startup")
 async def startup_event():
     await create_tables()
+    if WARMUP_ON_STARTUP:
+        # models load in the background; requests arriving first just wait for them
+        task = asyncio.get_running_loop().create_task(warmup_backend())
+        _background_tasks.add(task)
+        task.add_done_callback(_warmup_done)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_vector_store().aclose()
@@ -1,53 +1,577 @@
 # pipeline.py
+import json
+import time
+import asyncio
+import threading
+import functools
 import cv2
 import numpy as np
-from .services.detector import detect_faces
-from .services.embedder import compute_embedding_from_bgr
+from .services import detector, embedder
+from .services.detector import detect_faces_batch, choose_input_size
+from .services.embedder import compute_embedding_from_bgr, compute_embeddings_batch, align_face, FACE_SIZE
+from .services.batcher import MicroBatcher
+from .services.executor import run_cpu, run_io
+from .services.image_io import decode_image, decode_image_reduced, InvalidImage
+from .services.inference_server import get_inference_client
+from .services.stages import Stage, StagedPipeline
+from .services.quality import QualityRejected, get_profile, check_face_quality
+from .services.vector_store import search_vectors_batch
+from .config import (
+    COARSE_TO_FINE, COARSE_MAX_SIDE, COARSE_MARGIN, FACE_ALIGNMENT, TOP_K,
+    MICROBATCH_ENABLED, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS,
+    STAGED_PIPELINE, STAGE_WORKERS, STAGE_BATCH_SIZE, STAGE_QUEUE_SIZE,
+    MULTI_FACE_MIN_SCORE, MULTI_FACE_MAX_FACES, MULTI_FACE_MIN_FACE_RATIO,
+    REDUCED_DECODE, REDUCED_DECODE_MIN_SIDE, REDUCED_DECODE_MIN_FACE_PX,
+)
 
-def extract_face(img_bgr):
-    """
-    Extract face from image. Handles both full images and pre-cropped faces.
-    """
+
+def _elapsed_ms(t0):
+    return (time.perf_counter() - t0) * 1000
+
+
+def _is_face_crop(img_bgr):
     h, w = img_bgr.shape[:2]
-    
-    # If already a face crop, return as-is
-    if h <= 300 and w <= 300 and abs(h - w) < 50:
-        print(f"⚡ Image is {h}x{w}, treating as pre-cropped face")
-        return img_bgr
-    
-    # Otherwise detect
-    detections = detect_faces(img_bgr, score_thresh=0.3)
-    print(f"🔍 Found {len(detections)} faces")
-
-    if not detections:
-        # Fallback for small images
-        if h < 400 and w < 400:
-            print(f"⚠️ No detection but image is small, using as-is")
-            return img_bgr
-        return None
-    
-    det = max(detections, key=lambda x: x["score"])
-    x, y, w, h = det["box"]
+    return h <= 300 and w <= 300 and abs(h - w) < 50
+
+
+def _crop_box(img_bgr, box):
+    x, y, w, h = box
 
     h_img, w_img = img_bgr.shape[:2]
     x = max(0, x); y = max(0, y)
     x2 = min(x + w, w_img)
     y2 = min(y + h, h_img)
 
-    face = img_bgr[y:y2, x:x2]
-    
-    if face is None or face.size == 0:
+    return img_bgr[y:y2, x:x2]
+
+
+def _detect_best_batch(images, timings, stage):
+    t0 = time.perf_counter()
+    all_detections = detect_faces_batch(images, score_thresh=0.3)
+    timings[stage] = timings.get(stage, 0.0) + _elapsed_ms(t0)
+    return [max(dets, key=lambda x: x["score"]) if dets else None for dets in all_detections]
+
+
+def _shift(det, scale=1.0, dx=0, dy=0):
+    # map a detection from a thumbnail / region back to full-image coordinates
+    x, y, w, h = det["box"]
+    out = {
+        "box": [int(x / scale) + dx, int(y / scale) + dy, int(w / scale), int(h / scale)],
+        "score": det["score"],
+    }
+    if det.get("kps") is not None:
+        out["kps"] = [[px / scale + dx, py / scale + dy] for px, py in det["kps"]]
+    return out
+
+
+def _locate_faces(images, timings):
+    """
+    Best face detection (box and landmarks in full-resolution coordinates)
+    for every image, or None.
+
+    Large images are detected on a thumbnail first, then refined on a
+    margin-padded region of the full image, so the detector never sees
+    the full frame. Each detection stage is one batched SCRFD call.
+    """
+    coarse_inputs, scales = [], []
+    t0 = time.perf_counter()
+    for img in images:
+        h, w = img.shape[:2]
+        if COARSE_TO_FINE and max(h, w) > COARSE_MAX_SIDE:
+            scale = COARSE_MAX_SIDE / max(h, w)
+            coarse_inputs.append(cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA))
+        else:
+            scale = 1.0
+            coarse_inputs.append(img)
+        scales.append(scale)
+    if any(scale != 1.0 for scale in scales):
+        timings["thumbnail"] = _elapsed_ms(t0)
+
+    stage = "detect_coarse" if "thumbnail" in timings else "detect"
+    coarse = _detect_best_batch(coarse_inputs, timings, stage)
+
+    best = [None] * len(images)
+    regions, region_owners = [], []
+    for i, (img, det, scale) in enumerate(zip(images, coarse, scales)):
+        if det is None:
+            continue
+        if scale == 1.0:
+            best[i] = det
+            continue
+
+        # map the coarse box back to full resolution and pad it
+        h, w = img.shape[:2]
+        x, y, bw, bh = (v / scale for v in det["box"])
+        mx, my = bw * COARSE_MARGIN, bh * COARSE_MARGIN
+        rx1, ry1 = int(max(0, x - mx)), int(max(0, y - my))
+        rx2, ry2 = int(min(w, x + bw + mx)), int(min(h, y + bh + my))
+        best[i] = _shift(det, scale)
+
+        region = img[ry1:ry2, rx1:rx2]
+        if region.size:
+            regions.append(region)
+            region_owners.append((i, rx1, ry1))
+
+    if regions:
+        fine = _detect_best_batch(regions, timings, "detect_fine")
+        for det, (i, rx1, ry1) in zip(fine, region_owners):
+            # keep the scaled coarse box when the refine step finds nothing
+            if det is not None:
+                best[i] = _shift(det, dx=rx1, dy=ry1)
+
+    return best
+
+
+def _gate(face, score, settings, timings, face_px=None):
+    # quality gate on the face region; None when it passes or the gate is off
+    if settings is None:
         return None
-    
-    return face
+    t0 = time.perf_counter()
+    rejected = check_face_quality(face, score, settings, face_px)
+    timings["quality"] = timings.get("quality", 0.0) + _elapsed_ms(t0)
+    if rejected is not None:
+        print(f"🚫 Rejected before embedding: {rejected.detail}")
+    return rejected
+
 
-def extract_embedding(img_bgr):
+def _prepare_faces(images, timings, quality=None, originals=None):
+    """
+    What the embedder needs for every image: (face, kps), None (no face) or
+    a QualityRejected instance when `quality` names a gate profile the face
+    fails. With FACE_ALIGNMENT, detected faces are handed over as (full
+    image, landmarks) so the embedder warps them in one step without a crop
+    copy; otherwise face is a crop and kps is None.
+
+    originals[i], when given, is (encoded bytes, factor) for an image that
+    was decoded at 1/factor scale; faces too small in it are taken from a
+    full-resolution decode instead.
+    """
+    settings = get_profile(quality)
+    prepared = [None] * len(images)
+
+    # Pre-cropped faces are used as-is
+    to_detect = []
+    for i, img in enumerate(images):
+        if _is_face_crop(img):
+            h, w = img.shape[:2]
+            print(f"⚡ Image is {h}x{w}, treating as pre-cropped face")
+            prepared[i] = _gate(img, None, settings, timings) or (img, None)
+        else:
+            to_detect.append(i)
+
+    if not to_detect:
+        return prepared
+
+    dets = _locate_faces([images[i] for i in to_detect], timings)
+    print(f"🔍 Found faces in {sum(d is not None for d in dets)}/{len(dets)} images "
+          f"({', '.join(f'{k}={v:.1f}ms' for k, v in timings.items())})")
+
+    t0 = time.perf_counter()
+    for i, det in zip(to_detect, dets):
+        img = images[i]
+        h, w = img.shape[:2]
+        if det is None:
+            # Fallback for small images
+            if h < 400 and w < 400:
+                print(f"⚠️ No detection but image is small, using as-is")
+                prepared[i] = _gate(img, None, settings, timings) or (img, None)
+            continue
+
+        factor = originals[i][1] if originals and originals[i] else 1
+        if factor > 1 and min(det["box"][2:]) < REDUCED_DECODE_MIN_FACE_PX:
+            # too few pixels on the face at reduced scale: go back to the full-res bytes
+            t1 = time.perf_counter()
+            full = decode_image(originals[i][0])
+            timings["decode_full"] = timings.get("decode_full", 0.0) + _elapsed_ms(t1)
+            if full is not None:
+                img, det, factor = full, _shift(det, 1.0 / factor), 1
+
+        face = _crop_box(img, det["box"])
+        if face is None or face.size == 0:
+            continue
+
+        face_px = min(det["box"][2:]) * factor if factor > 1 else None
+        rejected = _gate(face, det["score"], settings, timings, face_px)
+        if rejected is not None:
+            prepared[i] = rejected
+        elif FACE_ALIGNMENT and det.get("kps") is not None:
+            prepared[i] = (img, det["kps"])
+        else:
+            prepared[i] = (face, None)
+    timings["crop"] = _elapsed_ms(t0)
+
+    return prepared
+
+
+def extract_faces_batch(images, timings=None):
+    """
+    Batched extract_face: one face crop (or None) per image, in input order.
+    Stage durations (ms) for the whole batch are recorded into `timings`.
+    """
+    if timings is None:
+        timings = {}
+    faces = []
+    for item in _prepare_faces(images, timings):
+        if item is None:
+            faces.append(None)
+        elif item[1] is None:
+            faces.append(item[0])
+        else:
+            faces.append(align_face(*item))
+    return faces
+
+
+def extract_face(img_bgr, timings=None):
+    """
+    Extract face from image. Handles both full images and pre-cropped faces.
+    Stage durations (ms) are recorded into `timings` when a dict is passed.
+    """
+    return extract_faces_batch([img_bgr], timings)[0]
+
+def extract_embedding(img_bgr, quality=None):
     """
     Full pipeline: extract face → embed
+    With a quality profile name, raises QualityRejected for faces that fail it.
     """
-    face = extract_face(img_bgr)
-    if face is None:
+    client = get_inference_client()
+    if client is not None:
+        result = client.embed_images([img_bgr], quality)[0]
+        if isinstance(result, QualityRejected):
+            raise result
+        return result
+
+    item = _prepare_faces([img_bgr], {}, quality)[0]
+    if item is None:
         return None
+    if isinstance(item, QualityRejected):
+        raise item
+
+    face, kps = item
+    embedding = compute_embedding_from_bgr(face, kps)
+    return embedding
+
+def extract_embeddings_batch(images, quality=None):
+    """
+    Batched extract_embedding: one embedding list, None or QualityRejected
+    instance per image. Detection and embedding each run as a single
+    batched model call.
+    """
+    client = get_inference_client()
+    if client is not None:
+        return client.embed_images(images, quality)
+    return _extract_embeddings_batch_local(images, quality)
+
+def _extract_embeddings_batch_local(images, quality=None):
+    return _embed_prepared(_prepare_faces(images, {}, quality))
+
+def _embed_prepared(prepared):
+    # one ArcFace call for every (face, kps) item; None / rejections pass through
+    found = [i for i, item in enumerate(prepared) if isinstance(item, tuple)]
+
+    embeddings = [item if isinstance(item, QualityRejected) else None for item in prepared]
+    if found:
+        batch = compute_embeddings_batch(
+            [prepared[i][0] for i in found],
+            [prepared[i][1] for i in found],
+        )
+        for i, emb in zip(found, batch):
+            embeddings[i] = emb.tolist()
+    return embeddings
+
+
+def warmup():
+    """
+    Load both models and run one dummy inference each, so the first real
+    request doesn't pay the session start-up cost. With an inference
+    server, only check that it answers.
+    """
+    client = get_inference_client()
+    if client is not None:
+        client.ping()
+        return
+    _warmup_local()
+
+def _warmup_local():
+    detector.warmup()
+    embedder.warmup()
+
+
+def embed_image_bytes(img_bytes, quality=None):
+    """
+    Decode + extract_embedding in one call, so only bytes go in and a list
+    comes out (cheap to hand to a worker process or the inference server).
+    Raises InvalidImage if the bytes can't be decoded, QualityRejected if
+    the face fails the `quality` profile.
+    """
+    client = get_inference_client()
+    if client is not None:
+        result = client.embed_encoded([img_bytes], quality)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    result = _embed_images_bytes_batch_local([img_bytes], quality)[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def embed_images_bytes_batch(batch, quality=None):
+    """
+    Batched embed_image_bytes. Undecodable or rejected entries come back as
+    an InvalidImage / QualityRejected instance instead of failing the batch.
+    """
+    client = get_inference_client()
+    if client is not None:
+        return client.embed_encoded(batch, quality)
+    return _embed_images_bytes_batch_local(batch, quality)
+
+def _decode(img_bytes):
+    # (image or None, factor): oversized JPEGs come back downscaled by `factor`
+    if REDUCED_DECODE:
+        return decode_image_reduced(img_bytes, REDUCED_DECODE_MIN_SIDE)
+    return decode_image(img_bytes), 1
+
+def _embed_images_bytes_batch_local(batch, quality=None):
+    decoded = [_decode(b) for b in batch]
+    valid = [i for i, (img, _) in enumerate(decoded) if img is not None]
+
+    prepared = _prepare_faces(
+        [decoded[i][0] for i in valid], {}, quality,
+        originals=[(batch[i], decoded[i][1]) for i in valid],
+    )
+    results = [InvalidImage("Invalid image file")] * len(batch)
+    for i, emb in zip(valid, _embed_prepared(prepared)):
+        results[i] = emb
+    return results
+
+
+# ---------------------------------------------------------------- multi-face
+
+def _embed_all_faces_local(img_bgr, quality=None, timings=None):
+    if timings is None:
+        timings = {}
+    settings = get_profile(quality)
+
+    # one detection pass over the whole image at a size that keeps small faces
+    t0 = time.perf_counter()
+    size = choose_input_size(img_bgr.shape, MULTI_FACE_MIN_FACE_RATIO)
+    dets = detect_faces_batch([img_bgr], score_thresh=MULTI_FACE_MIN_SCORE, size=size)[0]
+    dets = sorted(dets, key=lambda d: d["score"], reverse=True)[:MULTI_FACE_MAX_FACES]
+    timings["detect"] = _elapsed_ms(t0)
+
+    faces, to_embed = [], []
+    for det in dets:
+        face = {"box": [int(v) for v in det["box"]], "score": float(det["score"]), "embedding": None, "rejected": None}
+        crop = _crop_box(img_bgr, face["box"])
+        if crop is None or crop.size == 0:
+            continue
+        rejected = _gate(crop, det["score"], settings, timings)
+        if rejected is not None:
+            face["rejected"] = rejected.detail
+        elif FACE_ALIGNMENT and det.get("kps") is not None:
+            to_embed.append((face, img_bgr, det["kps"]))
+        else:
+            to_embed.append((face, crop, None))
+        faces.append(face)
+
+    # every accepted face in one ArcFace call
+    t0 = time.perf_counter()
+    if to_embed:
+        batch = compute_embeddings_batch([src for _, src, _ in to_embed], [kps for _, _, kps in to_embed])
+        for (face, _, _), emb in zip(to_embed, batch):
+            face["embedding"] = emb.tolist()
+    timings["embed"] = _elapsed_ms(t0)
+
+    print(f"👥 {len(to_embed)}/{len(faces)} faces embedded "
+          f"({', '.join(f'{k}={v:.1f}ms' for k, v in timings.items())})")
+    return faces
+
+def embed_all_faces_bytes(img_bytes, quality=None):
+    """
+    Multi-face counterpart of embed_image_bytes: every face scoring at least
+    MULTI_FACE_MIN_SCORE (up to MULTI_FACE_MAX_FACES, best first) as
+    {"box": [x, y, w, h], "score", "embedding", "rejected"}. Faces failing the
+    quality profile keep their box, with embedding None and the reason in
+    "rejected". Raises InvalidImage if the bytes can't be decoded.
+    """
+    client = get_inference_client()
+    if client is not None:
+        result = client.embed_all_faces(img_bytes, quality)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    img_bgr = decode_image(img_bytes)
+    if img_bgr is None:
+        raise InvalidImage("Invalid image file")
+    return _embed_all_faces_local(img_bgr, quality)
+
+# ---------------------------------------------------------------- video
+# Frame-level building blocks for services/video.py; like the functions
+# above they run on the inference server when one is configured.
+
+def detect_frames(frames, score_thresh):
+    # every detection in every frame, one SCRFD batch
+    client = get_inference_client()
+    if client is not None:
+        return client.detect(frames, score_thresh)
+    return _detect_frames_local(frames, score_thresh)
+
+def _detect_frames_local(frames, score_thresh):
+    return detect_faces_batch(frames, score_thresh=score_thresh)
+
+def face_chip(frame, det):
+    # 112x112 ArcFace input for one detection: aligned when landmarks exist
+    if FACE_ALIGNMENT and det.get("kps") is not None:
+        return align_face(frame, det["kps"])
+    crop = _crop_box(frame, det["box"])
+    if crop is None or crop.size == 0:
+        return None
+    return cv2.resize(crop, (FACE_SIZE, FACE_SIZE))
+
+def embed_faces(chips):
+    # face chips -> (N, 512) embeddings, one ArcFace call
+    client = get_inference_client()
+    if client is not None:
+        return client.embed_faces(chips)
+    return _embed_faces_local(chips)
+
+def _embed_faces_local(chips):
+    return compute_embeddings_batch(chips)
+
+# ---------------------------------------------------------------- staged
+# The same decode -> detect -> align -> embed path split into stages for
+# StagedPipeline, so steps of different images overlap on different cores.
+
+def _decode_stage(blobs):
+    # (image, bytes, factor) so the detect stage can go back to full resolution
+    out = []
+    for b in blobs:
+        img, factor = _decode(b)
+        out.append(InvalidImage("Invalid image file") if img is None else (img, b, factor))
+    return out
+
+def _detect_stage(decoded, quality=None):
+    return _prepare_faces(
+        [img for img, _, _ in decoded], {}, quality,
+        originals=[(b, factor) for _, b, factor in decoded],
+    )
+
+def _align_stage(prepared):
+    return [face if kps is None else align_face(face, kps) for face, kps in prepared]
+
+def _embed_stage(faces):
+    return [emb.tolist() for emb in compute_embeddings_batch(faces)]
+
+def embedding_stages(quality=None):
+    """
+    Stages turning encoded image bytes into an embedding list (or None / an
+    InvalidImage or QualityRejected instance). Bulk jobs add their own stages
+    around these, e.g. a download stage in front or a search/upsert stage after.
+    """
+    return [
+        Stage("decode", _decode_stage, STAGE_WORKERS.get("decode", 1)),
+        Stage("detect", functools.partial(_detect_stage, quality=quality), STAGE_WORKERS.get("detect", 1), STAGE_BATCH_SIZE),
+        Stage("align", _align_stage, STAGE_WORKERS.get("align", 1), STAGE_BATCH_SIZE),
+        Stage("embed", _embed_stage, STAGE_WORKERS.get("embed", 1), STAGE_BATCH_SIZE),
+    ]
+
+def _carry(fn):
+    # run a stage fn on the first element of (value, context) items; the
+    # context (e.g. a request's search filters) rides along unchanged
+    def run(items):
+        results = fn([value for value, _ in items])
+        return [
+            r if r is None or isinstance(r, Exception) else (r, ctx)
+            for r, (_, ctx) in zip(results, items)
+        ]
+    return run
+
+def _search_stage(queries, top_k, group_by):
+    # (embedding, filters) -> (embedding, hits); one store call per distinct filter
+    groups = {}
+    for i, (_, filters) in enumerate(queries):
+        groups.setdefault(json.dumps(filters, sort_keys=True), []).append(i)
+    out = [None] * len(queries)
+    for idx in groups.values():
+        hits = search_vectors_batch([queries[i][0] for i in idx], top_k, queries[idx[0]][1], group_by)
+        for i, h in zip(idx, hits):
+            out[i] = (queries[i][0], h)
+    return out
+
+def search_stages(quality=None, top_k=TOP_K, group_by="person_id"):
+    """
+    embedding_stages plus a vector search stage. Items are (image bytes,
+    filter_payload) pairs; results are (embedding, hits), or None / an
+    exception like embedding_stages.
+    """
+    stages = [Stage(s.name, _carry(s.fn), s.workers, s.batch_size) for s in embedding_stages(quality)]
+    search = functools.partial(_search_stage, top_k=top_k, group_by=group_by)
+    stages.append(Stage("search", search, STAGE_WORKERS.get("search", 1), STAGE_BATCH_SIZE))
+    return stages
+
+_staged = {}
+_staged_lock = threading.Lock()
+
+def get_staged_pipeline(quality=None, search=False):
+    # one per quality profile (and with/without search), shared by request
+    # handlers; started on first use
+    key = (quality, search)
+    if key not in _staged:
+        with _staged_lock:
+            if key not in _staged:
+                stages = search_stages(quality) if search else embedding_stages(quality)
+                _staged[key] = StagedPipeline(stages, queue_size=STAGE_QUEUE_SIZE).start()
+    return _staged[key]
+
+def staged_stats():
+    return {
+        f"{quality}{'+search' if search else ''}": staged.stats()
+        for (quality, search), staged in _staged.items()
+    } or None
+
+
+# Concurrent requests share detector/embedder calls through these batchers,
+# one per quality profile
+_batchers = {}
+
+def _get_batcher(quality):
+    if quality not in _batchers:
+        _batchers[quality] = MicroBatcher(
+            functools.partial(embed_images_bytes_batch, quality=quality),
+            max_batch=MICROBATCH_MAX_SIZE,
+            max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+        )
+    return _batchers[quality]
+
+async def embed_image_bytes_async(img_bytes, quality=None):
+    """
+    embed_image_bytes for request handlers: runs on the inference backend,
+    micro-batched with other in-flight requests when MICROBATCH_ENABLED, or
+    through the staged pipeline when STAGED_PIPELINE is on.
+    """
+    if STAGED_PIPELINE and get_inference_client() is None:
+        return await _run_staged(get_staged_pipeline(quality), img_bytes)
+    if MICROBATCH_ENABLED:
+        return await _get_batcher(quality).submit(img_bytes)
+    return await run_cpu(embed_image_bytes, img_bytes, quality)
+
+async def embed_and_search_async(img_bytes, filters=None, quality=None):
+    """
+    embed_image_bytes_async plus the /search vector query (TOP_K, one hit per
+    person). Returns (embedding, hits); with STAGED_PIPELINE the query is the
+    pipeline's last stage, otherwise hits is None and the caller searches
+    itself. (None, None) when no face was found.
+    """
+    if STAGED_PIPELINE and get_inference_client() is None:
+        result = await _run_staged(get_staged_pipeline(quality, search=True), (img_bytes, filters))
+        return result if result is not None else (None, None)
+    return await embed_image_bytes_async(img_bytes, quality), None
 
-    embedding = compute_embedding_from_bgr(face)
-    return embedding
\ No newline at end of file
+async def _run_staged(staged, item):
+    # submit() blocks while the first queue is full, so call it off the loop
+    future = await run_io(staged.submit, item)
+    result = await asyncio.wrap_future(future)
+    if isinstance(result, Exception):
+        raise result
+    return result
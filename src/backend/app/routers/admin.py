@@ -1,21 +1,27 @@
 # src/backend/app/routers/admin.py
 import json
 import uuid
+import asyncio
 import requests
-import numpy as np
-import cv2
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from ..auth.clerk_auth import verify_clerk_admin_token
 from ..services.db_service import AsyncSessionLocal
-from src.backend.db_files.models import Registration, Person
-from ..services.qdrant_service import upsert_point
+from src.backend.db_files.models import Registration, Person, PersonImage
+from ..services.vector_store import (
+    upsert_point_async, upsert_points_async, person_payload, person_image_payload, sync_person_payload,
+)
 from ..services.cloudinary_services import upload_image_fileobj
 from ..services.caseid import generate_next_case_id
-from ..pipeline import extract_embedding
+from ..pipeline import embed_image_bytes, embed_images_bytes_batch, InvalidImage, QualityRejected, staged_stats
+from ..services.executor import run_cpu, run_io
 from sqlalchemy import select, func
-from datetime import datetime
+from datetime import datetime, date, time
 from ..cache.dashboard_cache import clear_dashboard_cache
 from ..cache.person_cache import cache_person_metadata, invalidate_person_metadata
+from ..cache.search_cache import invalidate_search_cache
+from ..services.ort_session import describe_sessions
+from ..schemas import PersonUpdate
 
 router = APIRouter()
 
@@ -56,16 +62,20 @@ async def admin_verify(registration_id: str, approve: bool = True, _=Depends(ver
 
         pdata = json.loads(reg.person_data)
 
+        # the form stores ISO strings; the columns (and person_payload) want date/time
+        try:
+            last_seen_date = date.fromisoformat(pdata["last_seen_date"]) if pdata.get("last_seen_date") else None
+            last_seen_time = time.fromisoformat(pdata["last_seen_time"]) if pdata.get("last_seen_time") else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid last_seen_date / last_seen_time in registration")
+
         # Download face image
         try:
-            resp = requests.get(reg.person_image_url)
-            arr = np.frombuffer(resp.content, np.uint8)
-            img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        except:
+            resp = await run_io(requests.get, reg.person_image_url)
+            embedding = await run_cpu(embed_image_bytes, resp.content)
+        except (requests.RequestException, InvalidImage):
             raise HTTPException(500, "Failed to download face image")
 
-        embedding = extract_embedding(img)
-
         new_id = uuid.uuid4()
         case_id = await generate_next_case_id()
 
@@ -75,8 +85,8 @@ async def admin_verify(registration_id: str, approve: bool = True, _=Depends(ver
             age=pdata["age"],
             gender=pdata["gender"],
             last_seen_location=pdata["last_seen_location"],
-            last_seen_date=pdata["last_seen_date"],
-            last_seen_time=pdata["last_seen_time"],
+            last_seen_date=last_seen_date,
+            last_seen_time=last_seen_time,
             contact_info=pdata["contact_info"],
             additional_details=pdata["additional_details"],
             height=pdata.get("height"),
@@ -93,7 +103,7 @@ async def admin_verify(registration_id: str, approve: bool = True, _=Depends(ver
         await session.commit()
 
         # Cache metadata
-        cache_person_metadata(str(person.id), {
+        await run_io(cache_person_metadata, str(person.id), {
             "person_id": str(person.id),
             "name": person.name,
             "age": person.age,
@@ -104,16 +114,14 @@ async def admin_verify(registration_id: str, approve: bool = True, _=Depends(ver
 
         # Upsert embedding into Qdrant
         if embedding is not None:
-            upsert_point(str(person.id), embedding, {
-                "person_id": str(person.id),
-                "verified": True,
-                "image_url": person.image_url,
-            })
+            await upsert_point_async(str(person.id), embedding, person_payload(person))
 
         # Delete registration + clear dashboard
         await session.delete(reg)
         await session.commit()
-        clear_dashboard_cache()
+        # the new face can change any cached result
+        await run_io(invalidate_search_cache)
+        await run_io(clear_dashboard_cache)
 
         return {"status": "approved", "person_id": str(person.id)}
 
@@ -158,6 +166,11 @@ async def admin_dashboard(_=Depends(verify_clerk_admin_token)):
         set_dashboard_cache(dashboard)
         return dashboard
     
+@router.get("/admin/diagnostics")
+async def admin_diagnostics(_=Depends(verify_clerk_admin_token)):
+    return {"onnx": describe_sessions(), "stages": staged_stats()}
+
+
 @router.get("/admin/approved")
 async def admin_approved(_=Depends(verify_clerk_admin_token)):
     async with AsyncSessionLocal() as session:
@@ -174,6 +187,78 @@ async def admin_approved(_=Depends(verify_clerk_admin_token)):
         } for p in persons]
 
 
+@router.patch("/admin/persons/{person_id}")
+async def admin_update_person(person_id: str, update: PersonUpdate, _=Depends(verify_clerk_admin_token)):
+    async with AsyncSessionLocal() as session:
+        person = (await session.execute(select(Person).where(Person.id == person_id))).scalar_one_or_none()
+        if not person:
+            raise HTTPException(status_code=404, detail="Person not found")
+
+        for field, value in update.dict(exclude_unset=True).items():
+            setattr(person, field, value)
+        await session.commit()
+
+        # search reads these fields from the vector payload, so keep it in step
+        await sync_person_payload(person)
+        await run_io(invalidate_person_metadata, person_id)
+        await run_io(invalidate_search_cache)
+        await run_io(clear_dashboard_cache)
+
+        return {"status": "updated", "person_id": person_id}
+
+
+@router.post("/admin/persons/{person_id}/images")
+async def admin_add_person_images(
+    person_id: str, images: List[UploadFile] = File(...), _=Depends(verify_clerk_admin_token)
+):
+    # more photos of a known person (older, other angles): each becomes its own face point
+    async with AsyncSessionLocal() as session:
+        person = (await session.execute(select(Person).where(Person.id == person_id))).scalar_one_or_none()
+        if not person:
+            raise HTTPException(status_code=404, detail="Person not found")
+
+        blobs = [await f.read() for f in images]
+        # one batched detect + embed call for all the new photos
+        embeddings = await run_cpu(embed_images_bytes_batch, blobs, "register")
+
+        usable, skipped = [], []
+        for f, emb in zip(images, embeddings):
+            if isinstance(emb, QualityRejected):
+                skipped.append({"filename": f.filename, "reason": emb.detail})
+            elif isinstance(emb, Exception):
+                skipped.append({"filename": f.filename, "reason": "Invalid image file"})
+            elif emb is None:
+                skipped.append({"filename": f.filename, "reason": "No face detected"})
+            else:
+                usable.append((f, emb))
+
+        for f, emb in usable:
+            f.file.seek(0)
+        try:
+            urls = await asyncio.gather(*[run_io(upload_image_fileobj, f.file) for f, emb in usable])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to upload image: {e}")
+
+        points = []
+        for (f, emb), url in zip(usable, urls):
+            image = PersonImage(id=uuid.uuid4(), person_id=person.id, image_url=url)
+            session.add(image)
+            points.append((str(image.id), emb, person_image_payload(person, image)))
+
+        # points first: a row without its point would never be searched
+        if points:
+            await upsert_points_async(points)
+        await session.commit()
+        if points:
+            await run_io(invalidate_search_cache)
+
+        return {
+            "person_id": person_id,
+            "added": [{"image_id": pid, "image_url": payload["face_url"]} for pid, emb, payload in points],
+            "skipped": skipped,
+        }
+
+
 @router.get("/admin/rejected")
 async def admin_rejected(_=Depends(verify_clerk_admin_token)):
     async with AsyncSessionLocal() as session:
@@ -1,14 +1,12 @@
 # src/backend/app/routers/register.py
 import uuid
 import json
-import requests
-import numpy as np
-import cv2
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from ..services.cloudinary_services import upload_image_fileobj
 from ..services.db_service import AsyncSessionLocal
 from src.backend.db_files.models import Registration
-from ..pipeline import extract_embedding
+from ..pipeline import embed_image_bytes, InvalidImage, QualityRejected
+from ..services.executor import run_cpu, run_io
 from ..schemas import RegisterRequest, RegistrationResponse
 from datetime import datetime
 from ..schemas import RegistrationResponse
@@ -38,30 +36,33 @@ async def register_person(
     if not image:
         raise HTTPException(status_code=400, detail="Face image is required")
 
+    # Extract embedding from face (cache-worthy) before uploading anything,
+    # so unusable photos are rejected without a Cloudinary round trip
+    img_bytes = await image.read()
+    try:
+        embedding = await run_cpu(embed_image_bytes, img_bytes, "register")
+    except InvalidImage:
+        raise HTTPException(status_code=400, detail="Invalid image file")
+    except QualityRejected as e:
+        raise HTTPException(status_code=422, detail=e.detail)
+    embedding_flag = embedding is not None
+
     # Upload images to Cloudinary
+    image.file.seek(0)
     try:
-        face_url = upload_image_fileobj(image.file)
+        face_url = await run_io(upload_image_fileobj, image.file)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload face image: {e}")
 
     aadhar_url = None
     if aadhar_image:
         try:
-            aadhar_url = upload_image_fileobj(aadhar_image.file)
+            aadhar_url = await run_io(upload_image_fileobj, aadhar_image.file)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to upload Aadhar image: {e}")
 
-    # Extract embedding from face (cache-worthy)
-    image.file.seek(0)
-    img_bytes = await image.read()
-    arr = np.frombuffer(img_bytes, np.uint8)
-    img_bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-
-    embedding = extract_embedding(img_bgr)
-    embedding_flag = embedding is not None
-
     if embedding_flag:
-        set_cached_embedding(img_bytes, embedding)
+        await run_io(set_cached_embedding, img_bytes, embedding)
 
     # Create registration entry
     async with AsyncSessionLocal() as session:
@@ -91,6 +92,6 @@ async def register_person(
         await session.refresh(reg)
 
     # Invalidate admin dashboard (new pending registration)
-    clear_dashboard_cache()
+    await run_io(clear_dashboard_cache)
 
     return {"registration_id": str(reg.id), "status": reg.status}
\ No newline at end of file
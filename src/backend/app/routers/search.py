@@ -1,105 +1,252 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+import os
+import json
+import shutil
+import tempfile
+from datetime import date
+from typing import Union, Optional
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from ..services.detector import detect_faces
 # from ..services.embedder import compute_embedding_from_bgr
-from ..services.qdrant_service import search_vectors
+from ..services.vector_store import search_vectors_async, search_vectors_batch_async
 from ..services.cloudinary_services import upload_image_fileobj
 from ..config import TOP_K, SIMILARITY_THRESHOLD
-from ..pipeline import extract_embedding
-import cv2
-import numpy as np
-from ..schemas import SearchResponse, MatchItem
+from ..pipeline import embed_and_search_async, embed_all_faces_bytes, InvalidImage, QualityRejected
+from ..services.executor import run_cpu, run_io
+from ..services.video import VideoSearch, FrameSampler, video_frames, jpeg_frames, split_jpeg_stream
+from ..schemas import SearchResponse, MatchItem, FaceMatches, MultiFaceSearchResponse
 from ..cache.person_cache import get_person_metadata, cache_person_metadata
 from ..cache.embedding_cache import get_cached_embedding, set_cached_embedding
-from ..cache.search_cache import get_cached_search, set_cached_search
+from ..cache.search_cache import search_cache_key, get_cached_search, set_cached_search
 from ..services.db_service import AsyncSessionLocal
 from src.backend.db_files.models import Person
 from sqlalchemy import select
 
 router = APIRouter()
 
-@router.post("/search", response_model=SearchResponse)
-async def search_image(file: UploadFile = File(...)):
-    # Step 1 — read file
-    img_bytes = await file.read()
+async def _hits_to_matches(session, hits):
+    # points written by person_payload carry the display fields; older points
+    # are joined with person metadata (Redis cache, then Postgres)
+    matches = []
+    for h in hits:
+        print("PAYLOAD:", h.payload)
+        pid = (
+                h.payload.get("person_id") 
+                or h.payload.get("id") 
+                or h.payload.get("personId")
+            )
+
+        if not pid:
+            print("⚠ Skipping hit — no person_id in payload:", h.payload)
+            continue
+
+        if "name" in h.payload:
+            metadata = h.payload
+        else:
+            # try metadata cache
+            metadata = await run_io(get_person_metadata, pid)
+        if metadata is None:
+            # fetch from Postgres
+            stmt = select(Person).where(Person.id == pid)
+            res = await session.execute(stmt)
+            p = res.scalar_one_or_none()
+            if not p:
+                continue
+
+            metadata = {
+                "person_id": pid,
+                "name": p.name,
+                "age": p.age,
+                "image_url": p.image_url,
+                "last_seen_location": p.last_seen_location,
+                "case_id": p.case_id,
+                "case_status": p.case_status,
+            }
+            await run_io(cache_person_metadata, pid, metadata)
+
+        similarity =  h.score  # Qdrant returns distance, convert to similarity
+        print("RAW QDRANT SCORE:", h.score)
+        print("CONVERTED SIMILARITY:", similarity)
+        if similarity >= SIMILARITY_THRESHOLD:
+            matches.append(
+                MatchItem(
+                    person_id=str(pid),
+                    similarity=float(similarity),
+                    image_url=metadata["image_url"],
+                    name=metadata.get("name"),
+                    age=metadata.get("age"),
+                    last_seen_location=metadata.get("last_seen_location"),
+                    case_id=metadata.get("case_id"),
+                    case_status=metadata.get("case_status"),
+                    matched_image_url=h.payload.get("face_url"),
+                )
+            )
+    return matches
 
-    # Step 2 — decode image
-    nparr = np.frombuffer(img_bytes, np.uint8)
-    img_bgr = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if img_bgr is None:
+
+def search_filters(
+    case_status: Optional[str] = Query(None, description="e.g. active, found"),
+    gender: Optional[str] = Query(None),
+    age_min: Optional[int] = Query(None, ge=0),
+    age_max: Optional[int] = Query(None, ge=0),
+    location: Optional[str] = Query(None, description="words that must appear in last_seen_location"),
+    seen_after: Optional[date] = Query(None),
+    seen_before: Optional[date] = Query(None),
+):
+    # payload filter pushed down into the vector search (see VectorStore)
+    filters = {"verified": True}
+    if case_status:
+        filters["case_status"] = case_status
+    if gender:
+        filters["gender"] = gender
+    if age_min is not None or age_max is not None:
+        filters["age"] = {"gte": age_min, "lte": age_max}
+    if location:
+        filters["last_seen_location"] = {"text": location}
+    if seen_after or seen_before:
+        filters["last_seen_date"] = {
+            "gte": seen_after.isoformat() if seen_after else None,
+            "lte": seen_before.isoformat() if seen_before else None,
+        }
+    return filters
+
+
+async def _search_all_faces(img_bytes, filters):
+    # Group photos: every face embedded in one ArcFace call, one batched Qdrant search
+    try:
+        faces = await run_cpu(embed_all_faces_bytes, img_bytes, "search")
+    except InvalidImage:
         raise HTTPException(status_code=400, detail="Invalid image file")
+    if not faces:
+        raise HTTPException(status_code=400, detail="No face detected")
+
+    searched = [f for f in faces if f["embedding"] is not None]
+    hit_lists = await search_vectors_batch_async(
+        [f["embedding"] for f in searched], top_k=TOP_K, filter_payload=filters, group_by="person_id"
+    )
+
+    out, hit_lists = [], iter(hit_lists)
+    async with AsyncSessionLocal() as session:
+        for f in faces:
+            # faces rejected by the quality gate keep their box, with no matches
+            matches = await _hits_to_matches(session, next(hit_lists)) if f["embedding"] is not None else []
+            out.append(FaceMatches(box=f["box"], score=f["score"], matches=matches, rejected=f["rejected"]))
+
+    return MultiFaceSearchResponse(faces=out)
+
+
+@router.post("/search", response_model=Union[SearchResponse, MultiFaceSearchResponse])
+async def search_image(
+    file: UploadFile = File(...), multi_face: bool = Query(False), filters: dict = Depends(search_filters)
+):
+    # Step 1 — read file
+    img_bytes = await file.read()
+    if multi_face:
+        return await _search_all_faces(img_bytes, filters)
 
-    # Step 3 — embedding cache
-    embedding = get_cached_embedding(img_bytes)
+    # Step 2 — embedding cache
+    embedding = await run_io(get_cached_embedding, img_bytes)
+    hits = None
     if embedding is None:
-        embedding = extract_embedding(img_bgr)
+        # Step 3 — decode + detect + embed, off the event loop
+        # (with STAGED_PIPELINE the vector search runs as the last stage too)
+        try:
+            embedding, hits = await embed_and_search_async(img_bytes, filters, quality="search")
+        except InvalidImage:
+            raise HTTPException(status_code=400, detail="Invalid image file")
+        except QualityRejected as e:
+            raise HTTPException(status_code=422, detail=e.detail)
         if embedding is None:
             raise HTTPException(status_code=400, detail="No face detected")
-        set_cached_embedding(img_bytes, embedding)
+        await run_io(set_cached_embedding, img_bytes, embedding)
 
     # Step 4 — search cache
-    cached = get_cached_search(embedding)
+    cache_key = await run_io(search_cache_key, embedding, filters)
+    cached = await run_io(get_cached_search, cache_key)
     if cached:
         return SearchResponse(matches=cached)
 
     # Step 5 — query Qdrant
-    hits = search_vectors(embedding, top_k=TOP_K, filter_payload={"verified": True})
-    print("DEBUG HIT SAMPLE:", hits[0].__dict__)
+    # top people, not top photos: a person can have several face points
+    if hits is None:
+        hits = await search_vectors_async(embedding, top_k=TOP_K, filter_payload=filters, group_by="person_id")
     if not hits:
         return SearchResponse(matches=[])
+    print("DEBUG HIT SAMPLE:", hits[0])
 
     # Step 6 — join with Postgres metadata
-    matches = []
     async with AsyncSessionLocal() as session:
-        for h in hits:
-            print("PAYLOAD:", h.payload)
-            pid = (
-                    h.payload.get("person_id") 
-                    or h.payload.get("id") 
-                    or h.payload.get("personId")
-                )
-
-            if not pid:
-                print("⚠ Skipping hit — no person_id in payload:", h.payload)
-                continue
-
-            # try metadata cache
-            metadata = get_person_metadata(pid)
-            if metadata is None:
-                # fetch from Postgres
-                stmt = select(Person).where(Person.id == pid)
-                res = await session.execute(stmt)
-                p = res.scalar_one_or_none()
-                if not p:
-                    continue
-
-                metadata = {
-                    "person_id": pid,
-                    "name": p.name,
-                    "age": p.age,
-                    "image_url": p.image_url,
-                    "last_seen_location": p.last_seen_location,
-                    "case_id": p.case_id,
-                }
-                cache_person_metadata(pid, metadata)
-
-            similarity =  h.score  # Qdrant returns distance, convert to similarity
-            print("RAW QDRANT SCORE:", h.score)
-            print("CONVERTED SIMILARITY:", similarity)
-            if similarity >= SIMILARITY_THRESHOLD:
-                matches.append(
-                    MatchItem(
-                        person_id=metadata["person_id"],
-                        similarity=float(similarity),
-                        image_url=metadata["image_url"],
-                        name=metadata.get("name"),
-                        age=metadata.get("age"),
-                        last_seen_location=metadata.get("last_seen_location"),
-                        case_id=metadata.get("case_id"),
-                    )
-                )
+        matches = await _hits_to_matches(session, hits)
 
     # Step 7 — cache results
     results_payload = [m.dict() for m in matches]
-    set_cached_search(embedding, results_payload)
+    await run_io(set_cached_search, cache_key, results_payload)
+
+    return SearchResponse(matches=matches)
+
+
+def _save_upload(file, suffix):
+    # OpenCV reads video from a path, so the upload is spooled to a temp file
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    with tmp:
+        file.file.seek(0)
+        shutil.copyfileobj(file.file, tmp)
+    return tmp.name
+
+
+@router.post("/search/video")
+async def search_video(file: UploadFile = File(...), filters: dict = Depends(search_filters)):
+    """
+    Search a CCTV clip (any container OpenCV reads) or a concatenated JPEG
+    frame stream. Results stream back as NDJSON while the footage is being
+    processed: "match" when a tracked face's best matches improve,
+    "track_end" when a face leaves, "progress" per batch and a final "done".
+    """
+    head = await file.read(2)
+    tmp_path = None
+
+    def cleanup():
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    sampler = FrameSampler()
+    try:
+        if head == b"\xff\xd8":
+            data = head + await file.read()
+            frames = jpeg_frames(split_jpeg_stream(data), sampler)
+        else:
+            tmp_path = await run_io(_save_upload, file, os.path.splitext(file.filename or "")[1] or ".mp4")
+            frames = video_frames(tmp_path, sampler)
+
+        search = VideoSearch(frames, sampler, top_k=TOP_K, filter_payload=filters)
+
+        # tracker state lives in this process, so steps run on a thread (run_io)
+        # rather than on the process backend
+        first = await run_io(search.step)
+    except ValueError as e:
+        cleanup()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        cleanup()
+        raise
+
+    async def stream():
+        events = first
+        while events is not None:
+            async with AsyncSessionLocal() as session:
+                for ev in events:
+                    kind = ev["type"]
+                    if kind == "match":
+                        matches = await _hits_to_matches(session, ev["hits"])
+                        out = {"type": kind, **ev["track"].summary(), "matches": [m.dict() for m in matches]}
+                    elif kind == "track_end":
+                        out = {"type": kind, **ev["track"].summary(), "matched": bool(ev["track"].hits)}
+                    else:
+                        out = ev
+                    yield json.dumps(out) + "\n"
+            events = await run_io(search.step)
 
-    return SearchResponse(matches=matches)
\ No newline at end of file
+    # the background task runs once the response ends, including when the
+    # client disconnects before or during streaming
+    return StreamingResponse(stream(), media_type="application/x-ndjson", background=BackgroundTask(cleanup))
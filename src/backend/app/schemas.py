@@ -1,6 +1,7 @@
 # src/backend/app/schemas.py
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import date
 
 class MatchItem(BaseModel):
     person_id: str
@@ -10,10 +11,22 @@ class MatchItem(BaseModel):
     age: Optional[int] = None
     last_seen_location: Optional[str] = None
     case_id: Optional[str] = None
+    case_status: Optional[str] = None
+    matched_image_url: Optional[str] = None  # the person's photo that matched, if not image_url
 
 class SearchResponse(BaseModel):
     matches: List[MatchItem]
 
+# Multi-face search: one entry per detected face, best detection first
+class FaceMatches(BaseModel):
+    box: List[int]  # x, y, w, h in the uploaded image
+    score: float
+    matches: List[MatchItem]
+    rejected: Optional[dict] = None  # quality gate reason when the face wasn't searched
+
+class MultiFaceSearchResponse(BaseModel):
+    faces: List[FaceMatches]
+
 class RegisterRequest(BaseModel):
     name: str
     age: int
@@ -44,6 +57,15 @@ class AdminRegistrationItem(BaseModel):
 class AdminRegistrationList(BaseModel):
     pending: List[AdminRegistrationItem]
 
+# Admin edit of a verified person; only the fields sent are changed
+class PersonUpdate(BaseModel):
+    name: Optional[str] = None
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    last_seen_location: Optional[str] = None
+    last_seen_date: Optional[date] = None
+    case_status: Optional[str] = None
+
 class ApproveRegistrationResponse(BaseModel):
     status: str
     person_id: Optional[str] = None
@@ -0,0 +1,65 @@
+# src/backend/app/services/batcher.py
+import asyncio
+from .executor import run_cpu
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to max_wait_ms (or until max_batch
+    items are waiting) and runs them through `fn` as one batch.
+
+    `fn` takes a list of items and returns a list of results in the same
+    order; it runs on the inference backend (see executor.run_cpu) so the
+    loop stays free while the model works. A result that is an Exception
+    instance is raised to that item's caller only.
+    """
+
+    def __init__(self, fn, max_batch=8, max_wait_ms=5.0):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []  # (item, future)
+        self._timer = None
+        self._tasks = set()  # running batches; the loop only keeps weak references
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((item, fut))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await run_cpu(self.fn, items)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for (_, fut), result in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
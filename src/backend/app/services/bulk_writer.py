@@ -0,0 +1,113 @@
+# src/backend/app/services/bulk_writer.py
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .vector_store import get_vector_store
+from ..config import UPSERT_BATCH_SIZE, UPSERT_PARALLEL, UPSERT_RETRIES, UPSERT_BACKOFF, UPSERT_WAIT
+
+
+def _delay(attempt, backoff):
+    # exponential backoff with jitter so parallel writers don't retry in lockstep
+    return backoff * (2 ** attempt) * (0.5 + random.random())
+
+
+def upsert_with_retry(store, points, wait=True, retries=UPSERT_RETRIES, backoff=UPSERT_BACKOFF):
+    for attempt in range(retries + 1):
+        try:
+            store.upsert(points, wait=wait)
+            return attempt
+        except Exception as e:
+            if attempt == retries:
+                raise
+            print(f"⚠ Upsert of {len(points)} points failed ({e}), retrying")
+            time.sleep(_delay(attempt, backoff))
+
+
+async def aupsert_with_retry(store, points, wait=True, retries=UPSERT_RETRIES, backoff=UPSERT_BACKOFF):
+    for attempt in range(retries + 1):
+        try:
+            await store.aupsert(points, wait=wait)
+            return attempt
+        except Exception as e:
+            if attempt == retries:
+                raise
+            print(f"⚠ Upsert of {len(points)} points failed ({e}), retrying")
+            await asyncio.sleep(_delay(attempt, backoff))
+
+
+class BulkWriter:
+    """
+    Buffers points and upserts them in batches of `batch_size`, with up to
+    `parallel` batches in flight on worker threads. add() only blocks when
+    that many batches are already pending, so producers (embedding, download)
+    keep running while earlier batches are on the wire.
+
+    A batch that still fails after `retries` is counted and logged, not
+    raised, so one bad batch doesn't abort a rebuild; check stats()["failed"].
+    """
+
+    def __init__(self, store=None, batch_size=UPSERT_BATCH_SIZE, parallel=UPSERT_PARALLEL,
+                 retries=UPSERT_RETRIES, backoff=UPSERT_BACKOFF, wait=UPSERT_WAIT):
+        self.store = store or get_vector_store()
+        self.batch_size = max(1, batch_size)
+        self.retries = retries
+        self.backoff = backoff
+        self.wait = wait
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max(1, parallel))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="upsert")
+        self._stats = {"written": 0, "batches": 0, "retries": 0, "failed": 0}
+        self._started_at = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, point_id, vector, payload):
+        with self._lock:
+            self._buffer.append((point_id, vector, payload))
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._submit(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._submit(batch)
+
+    def close(self):
+        # send what's buffered and wait for every batch in flight
+        self.flush()
+        self._pool.shutdown(wait=True)
+
+    def _submit(self, batch):
+        self._slots.acquire()
+        self._pool.submit(self._write, batch)
+
+    def _write(self, batch):
+        try:
+            attempts = upsert_with_retry(self.store, batch, self.wait, self.retries, self.backoff)
+            with self._lock:
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["retries"] += attempts
+        except Exception as e:
+            print(f"❌ Dropped batch of {len(batch)} points after {self.retries} retries: {e}")
+            with self._lock:
+                self._stats["failed"] += len(batch)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+        elapsed = time.perf_counter() - self._started_at
+        out["points_per_s"] = round(out["written"] / elapsed, 1) if elapsed > 0 else 0.0
+        return out
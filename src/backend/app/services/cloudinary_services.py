@@ -1,14 +1,25 @@
-import cloudinary
-import cloudinary.uploader
+import threading
 from ...app.config import CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
 
-cloudinary.config(
-    cloud_name=CLOUDINARY_CLOUD_NAME,
-    api_key=CLOUDINARY_API_KEY,
-    api_secret=CLOUDINARY_API_SECRET
-)
+_configured = {"done": False}
+_lock = threading.Lock()
+
+def _uploader():
+    # cloudinary is imported and configured on the first upload
+    import cloudinary
+    import cloudinary.uploader
+    if not _configured["done"]:
+        with _lock:
+            if not _configured["done"]:
+                cloudinary.config(
+                    cloud_name=CLOUDINARY_CLOUD_NAME,
+                    api_key=CLOUDINARY_API_KEY,
+                    api_secret=CLOUDINARY_API_SECRET
+                )
+                _configured["done"] = True
+    return cloudinary.uploader
 
 def upload_image_fileobj(fileobj, public_id=None):
     # fileobj: file-like object (BytesIO or starlette UploadFile.file)
-    response = cloudinary.uploader.upload(fileobj, public_id=public_id, overwrite=False)
+    response = _uploader().upload(fileobj, public_id=public_id, overwrite=False)
     return response.get("secure_url")
@@ -1,7 +1,7 @@
 from ..config import DATABASE_URL
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from src.backend.db_files.models import Base, Person, Registration  # your models path
+from src.backend.db_files.models import Base, Person, Registration, PersonImage  # your models path
 
 import ssl
 
@@ -2,141 +2,190 @@
 
 import cv2
 import numpy as np
-import onnxruntime as ort
-from ..config import SCRFD_ONNX
+from .nms import run_nms
+from .ort_session import LazySession
+from ..config import SCRFD_ONNX, SCRFD_ORT_SETTINGS, DETECTOR_INPUT_SIZES, DETECTOR_MIN_FACE_RATIO
 
 
-session = ort.InferenceSession(SCRFD_ONNX, providers=["CPUExecutionProvider"])
-input_name = session.get_inputs()[0].name
+# loaded on first detection (or warmup())
+model = LazySession("scrfd", SCRFD_ONNX, SCRFD_ORT_SETTINGS)
 
 STRIDES = [8, 16, 32]
 NUM_ANCHORS = 2  # SCRFD uses 2 anchors per location
+NUM_KPS = 5  # eyes, nose, mouth corners
+MIN_FACE_PIXELS = 32  # face size (in detector input pixels) SCRFD finds reliably
+
+# (input_h, input_w, stride) -> (N, 2) anchor centers, built once per size
+_anchor_cache = {}
 
 
 def preprocess(img, size=640):
-    img_resized = cv2.resize(img, (size, size))
-    blob = img_resized.astype(np.float32)
-    blob = blob.transpose(2, 0, 1)[None, ...]
-    return blob, img_resized.shape[:2]
+    """
+    Letterbox the image into a size x size canvas (top-left aligned) so the
+    aspect ratio is kept. Returns the blob and the scale applied to the image.
+    """
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_h, new_w = int(round(h * scale)), int(round(w * scale))
+
+    canvas = np.zeros((size, size, 3), dtype=np.uint8)
+    canvas[:new_h, :new_w] = cv2.resize(img, (new_w, new_h))
+
+    # SCRFD expects RGB, normalized as (img - 127.5) / 128
+    blob = cv2.dnn.blobFromImage(
+        canvas, 1.0 / 128.0, (size, size), (127.5, 127.5, 127.5), swapRB=True
+    )
+    return blob, scale
+
+
+def choose_input_size(img_shape, min_face_ratio=DETECTOR_MIN_FACE_RATIO):
+    """
+    Pick the smallest detector input size at which the smallest expected face
+    (min_face_ratio of the longest image side) still spans MIN_FACE_PIXELS.
+    Letterboxing maps the longest side to min(size, longest) pixels, so that
+    face spans min_face_ratio * min(size, longest): large frames need
+    MIN_FACE_PIXELS / min_face_ratio, small images just their own size
+    (never upscaled past the first size that fits them).
+    """
+    longest = max(img_shape[:2])
+    needed = min(longest, MIN_FACE_PIXELS / min_face_ratio)
+    for size in sorted(DETECTOR_INPUT_SIZES):
+        if size >= needed:
+            return size
+    return max(DETECTOR_INPUT_SIZES)
 
 
 def generate_anchors(feat_shape, stride):
-    # centers of each cell in feature map
+    # centers of each cell in feature map, cached per (feature map, stride)
     h, w = feat_shape
-    anchor_centers = []
-    for i in range(h):
-        for j in range(w):
-            cx = (j + 0.5) * stride
-            cy = (i + 0.5) * stride
-            anchor_centers.append([cx, cy])
-    anchor_centers = np.array(anchor_centers)
-    anchor_centers = np.repeat(anchor_centers, NUM_ANCHORS, axis=0)
-    return anchor_centers
+    key = (h, w, stride)
+    anchors = _anchor_cache.get(key)
+    if anchors is None:
+        ys, xs = np.mgrid[:h, :w]
+        anchors = np.stack([xs, ys], axis=-1).reshape(-1, 2).astype(np.float32)
+        anchors = (anchors + 0.5) * stride
+        anchors = np.repeat(anchors, NUM_ANCHORS, axis=0)
+        anchors.setflags(write=False)
+        _anchor_cache[key] = anchors
+    return anchors
 
 
 def decode_bboxes(anchors, preds):
-    # SCRFD bbox format: dx, dy, dw, dh (all scaled by stride)
-    x = anchors[:, 0]
-    y = anchors[:, 1]
-
-    dx = preds[:, 0]
-    dy = preds[:, 1]
-    dw = preds[:, 2]
-    dh = preds[:, 3]
+    # SCRFD bbox format: distances (left, top, right, bottom) from the anchor center
+    return np.concatenate([anchors - preds[:, :2], anchors + preds[:, 2:4]], axis=-1)
 
-    x1 = x - dx
-    y1 = y - dy
-    x2 = x + dw
-    y2 = y + dh
 
-    return np.stack([x1, y1, x2, y2], axis=-1)
+def decode_kps(anchors, preds):
+    # SCRFD landmark format: (dx, dy) offsets from the anchor center for each point
+    return preds.reshape(-1, NUM_KPS, 2) + anchors[:, None, :]
 
 
-def nms(boxes, scores, thresh=0.4):
-    x1, y1, x2, y2 = boxes.T
-    areas = (x2 - x1) * (y2 - y1)
-    order = scores.argsort()[::-1]
-    keep = []
+def postprocess(outputs, size, score_thresh):
+    """
+    Decode raw SCRFD outputs (scores, boxes and landmarks for every stride)
+    into input-space boxes, scores and 5-point landmarks above the threshold.
+    """
+    fmc = len(STRIDES)
+    has_kps = len(outputs) >= fmc * 3
 
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
+    all_scores, all_boxes, all_kps = [], [], []
+    for idx, stride in enumerate(STRIDES):
+        scores = outputs[idx].reshape(-1)
+        mask = scores > score_thresh
+        if not mask.any():
+            continue
 
-        xx1 = np.maximum(x1[i], x1[order[1:]])
-        yy1 = np.maximum(y1[i], y1[order[1:]])
-        xx2 = np.minimum(x2[i], x2[order[1:]])
-        yy2 = np.minimum(y2[i], y2[order[1:]])
+        anchors = generate_anchors((size // stride, size // stride), stride)[mask]
+        bbox_preds = outputs[idx + fmc].reshape(-1, 4)[mask] * stride
 
-        w = np.maximum(0.0, xx2 - xx1)
-        h = np.maximum(0.0, yy2 - yy1)
+        all_scores.append(scores[mask])
+        all_boxes.append(decode_bboxes(anchors, bbox_preds))
+        if has_kps:
+            kps_preds = outputs[idx + fmc * 2].reshape(-1, NUM_KPS * 2)[mask] * stride
+            all_kps.append(decode_kps(anchors, kps_preds))
 
-        inter = w * h
-        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+    if not all_scores:
+        return np.empty((0,), np.float32), np.empty((0, 4), np.float32), None
 
-        inds = np.where(iou <= thresh)[0]
-        order = order[inds + 1]
+    scores = np.concatenate(all_scores, axis=0)
+    boxes = np.concatenate(all_boxes, axis=0)
+    kps = np.concatenate(all_kps, axis=0) if has_kps else None
+    return scores, boxes, kps
 
-    return keep
 
+def _finalize(outputs, img_shape, scale, size, score_thresh):
+    h0, w0 = img_shape[:2]
 
-def detect_faces(img_bgr, score_thresh=0.4, size=640):
-    h0, w0 = img_bgr.shape[:2]
-    blob, _ = preprocess(img_bgr, size)
+    scores, boxes, kps = postprocess(outputs, size, score_thresh)
+    if scores.size == 0:
+        return []
 
-    outputs = session.run(None, {input_name: blob})
+    # scale back to original (letterbox is top-left aligned, so only a rescale)
+    boxes /= scale
+    if kps is not None:
+        kps /= scale
 
-    all_scores = []
-    all_boxes = []
+    # NMS
+    keep, scores = run_nms(boxes, scores, score_thresh, thresh=0.45)
 
-    idx = 0
-    for stride in STRIDES:
-        # shapes: (N,1), (N,4)
-        scores = outputs[idx].reshape(-1)
-        bboxes = outputs[idx + 3].reshape(-1, 4)
+    detections = []
+    for i, score in zip(keep, scores):
+        x1, y1, x2, y2 = boxes[i]
+        x1 = int(max(0, x1))
+        y1 = int(max(0, y1))
+        x2 = int(min(w0, x2))
+        y2 = int(min(h0, y2))
+        det = {
+            "box": [x1, y1, x2 - x1, y2 - y1],
+            "score": float(score)
+        }
+        if kps is not None:
+            det["kps"] = kps[i].tolist()
+        detections.append(det)
 
-        h_feat = size // stride
-        w_feat = size // stride
+    return detections
 
-        anchors = generate_anchors((h_feat, w_feat), stride)
 
-        # decode box deltas
-        bboxes = decode_bboxes(anchors, bboxes)
+def detect_faces(img_bgr, score_thresh=0.4, size=None):
+    if size is None:
+        size = choose_input_size(img_bgr.shape)
+    blob, scale = preprocess(img_bgr, size)
 
-        # filter low scores
-        mask = scores > score_thresh
-        scores = scores[mask]
-        bboxes = bboxes[mask]
+    outputs = model.session.run(None, {model.input_name: blob})
 
-        all_scores.append(scores)
-        all_boxes.append(bboxes)
+    return _finalize(outputs, img_bgr.shape, scale, size, score_thresh)
 
-        idx += 1
 
-    if len(all_scores) == 0:
+def detect_faces_batch(images, score_thresh=0.4, size=None):
+    """
+    Detect faces in several images with a single SCRFD call.
+    Returns one list of detections per image, in input order.
+    """
+    if not images:
         return []
+    if size is None:
+        size = max(choose_input_size(img.shape) for img in images)
+    if not model.batch_supported:
+        return [detect_faces(img, score_thresh, size) for img in images]
 
-    scores = np.concatenate(all_scores, axis=0)
-    boxes = np.concatenate(all_boxes, axis=0)
+    n = len(images)
+    blob = np.empty((n, 3, size, size), dtype=np.float32)
+    scales = []
+    for i, img in enumerate(images):
+        blob[i], scale = preprocess(img, size)
+        scales.append(scale)
 
-    # scale back to original
-    scale_x = w0 / size
-    scale_y = h0 / size
-    boxes[:, [0, 2]] *= scale_x
-    boxes[:, [1, 3]] *= scale_y
+    outputs = model.session.run(None, {model.input_name: blob})
 
-    # NMS
-    keep = nms(boxes, scores, thresh=0.45)
+    # outputs are (N, A, C) or flattened (N*A, C); split them per image
+    outputs = [out.reshape(n, -1, out.shape[-1]) for out in outputs]
 
-    detections = []
-    for i in keep:
-        x1, y1, x2, y2 = boxes[i]
-        x1 = int(max(0, x1))
-        y1 = int(max(0, y1))
-        x2 = int(min(w0, x2))
-        y2 = int(min(h0, y2))
-        detections.append({
-            "box": [x1, y1, x2 - x1, y2 - y1],
-            "score": float(scores[i])
-        })
+    return [
+        _finalize([out[i] for out in outputs], img.shape, scales[i], size, score_thresh)
+        for i, img in enumerate(images)
+    ]
 
-    return detections
+
+def warmup():
+    # load the session and run one dummy detection
+    detect_faces(np.zeros((DETECTOR_INPUT_SIZES[0], DETECTOR_INPUT_SIZES[0], 3), dtype=np.uint8))
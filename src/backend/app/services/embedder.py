@@ -1,17 +1,30 @@
-import onnxruntime as ort
 import numpy as np
 import cv2
-from ..config import BUFFALO_ONNX as ARC_PATH
+from .ort_session import LazySession
+from ..config import BUFFALO_ONNX as ARC_PATH, ARCFACE_ORT_SETTINGS
 
-# initialize ONNX session once
-session = ort.InferenceSession(ARC_PATH, providers=["CPUExecutionProvider"])
+# ONNX session is created once, on first embedding (or warmup())
+model = LazySession("arcface", ARC_PATH, ARCFACE_ORT_SETTINGS)
 
-input_name = session.get_inputs()[0].name
-output_name = session.get_outputs()[0].name
+def uint8_input():
+    # models fused by pipelines/fuse_arcface_preprocess.py take raw uint8 BGR NHWC
+    # and do the channel swap + normalization inside the graph
+    return model.input_type == "tensor(uint8)"
+
+FACE_SIZE = 112
+
+# ArcFace reference landmarks for a 112x112 aligned face
+ARCFACE_TEMPLATE = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041],
+], dtype=np.float32)
 
 def preprocess_face_bgr(img_bgr):
     # ArcFace expects 112x112, normalized as (img - 127.5)/128
-    img = cv2.resize(img_bgr, (112, 112))
+    img = cv2.resize(img_bgr, (FACE_SIZE, FACE_SIZE))
     # convert BGR->RGB for model if it expects RGB; our earlier model used RGB normalization
     img = img[:, :, ::-1]
     img = np.transpose(img, (2, 0, 1)).astype(np.float32)
@@ -19,9 +32,78 @@ def preprocess_face_bgr(img_bgr):
     img = (img - 127.5) / 128.0
     return img
 
-def compute_embedding_from_bgr(img_bgr):
-    x = preprocess_face_bgr(img_bgr)
-    embedding = session.run([output_name], {input_name: x})[0][0]
-    # L2 normalize
-    embedding = embedding / np.linalg.norm(embedding)# Normalize to make cosine similarity meaningful
-    return embedding.tolist()
+def similarity_transform(src, dst):
+    # least-squares rotation + uniform scale + translation mapping src -> dst (Umeyama)
+    src_mean, dst_mean = src.mean(axis=0), dst.mean(axis=0)
+    src_c, dst_c = src - src_mean, dst - dst_mean
+
+    U, S, Vt = np.linalg.svd(dst_c.T @ src_c / len(src))
+    D = np.diag([1.0, np.sign(np.linalg.det(U @ Vt)) or 1.0])
+    R = U @ D @ Vt
+    scale = np.trace(np.diag(S) @ D) / (src_c ** 2).sum(axis=1).mean()
+
+    t = dst_mean - scale * R @ src_mean
+    return np.hstack([scale * R, t[:, None]])
+
+def align_face(img_bgr, kps, out=None):
+    """
+    Warp the face to the 112x112 ArcFace template from its 5 SCRFD landmarks
+    (full-image coordinates) in one warpAffine, writing into `out` if given.
+    """
+    M = similarity_transform(np.asarray(kps, dtype=np.float64), ARCFACE_TEMPLATE.astype(np.float64))
+    return cv2.warpAffine(img_bgr, M, (FACE_SIZE, FACE_SIZE), dst=out, borderValue=0.0)
+
+def _to_face(img_bgr, kps, out=None):
+    if kps is not None:
+        return align_face(img_bgr, kps, out)
+    return cv2.resize(img_bgr, (FACE_SIZE, FACE_SIZE), dst=out)
+
+def preprocess_faces_bgr(faces, kps=None):
+    """
+    Build the model input for N faces in one preallocated tensor.
+    faces[i] is a face crop, or the full image when kps[i] holds its landmarks.
+    """
+    if kps is None:
+        kps = [None] * len(faces)
+
+    if uint8_input():
+        # (N, 112, 112, 3) uint8: faces are warped straight into the batch
+        batch = np.empty((len(faces), FACE_SIZE, FACE_SIZE, 3), dtype=np.uint8)
+        for i, (face, pts) in enumerate(zip(faces, kps)):
+            _to_face(face, pts, out=batch[i])
+        return batch
+
+    # same as preprocess_face_bgr, written straight into one (N, 3, 112, 112) tensor
+    batch = np.empty((len(faces), 3, FACE_SIZE, FACE_SIZE), dtype=np.float32)
+    for i, (face, pts) in enumerate(zip(faces, kps)):
+        batch[i] = _to_face(face, pts)[:, :, ::-1].transpose(2, 0, 1)
+    batch -= 127.5
+    batch /= 128.0
+    return batch
+
+def compute_embeddings_batch(faces, kps=None):
+    """
+    Embed N faces with one ArcFace call; see preprocess_faces_bgr for kps.
+    Returns an (N, 512) float32 array of L2-normalized embeddings.
+    """
+    if len(faces) == 0:
+        return np.empty((0, 512), dtype=np.float32)
+
+    x = preprocess_faces_bgr(faces, kps)
+    session, output_names = model.session, [model.output_name]
+    if model.batch_supported:
+        embeddings = session.run(output_names, {model.input_name: x})[0]
+    else:
+        embeddings = np.concatenate([session.run(output_names, {model.input_name: x[i:i + 1]})[0] for i in range(len(faces))])
+
+    # L2 normalize to make cosine similarity meaningful
+    embeddings = embeddings.astype(np.float32, copy=False)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+def compute_embedding_from_bgr(img_bgr, kps=None):
+    return compute_embeddings_batch([img_bgr], None if kps is None else [kps])[0].tolist()
+
+def warmup():
+    # load the session and run one dummy embedding
+    compute_embeddings_batch([np.zeros((FACE_SIZE, FACE_SIZE, 3), dtype=np.uint8)])
@@ -0,0 +1,71 @@
+# src/backend/app/services/executor.py
+import asyncio
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from ..config import INFERENCE_BACKEND, INFERENCE_WORKERS
+
+# INFERENCE_BACKEND:
+#   "thread"  - CPU work runs in a thread pool (ONNX Runtime and OpenCV release the GIL)
+#   "process" - CPU work runs in worker processes that load their own models
+#   "inline"  - CPU work runs on the event loop (the old behaviour, for benchmarks)
+_pool = {"executor": None}
+_lock = threading.Lock()
+
+
+def _init_worker():
+    # runs once in every worker process: load the models before the first job
+    from ..pipeline import warmup
+    warmup()
+
+
+def get_executor():
+    if _pool["executor"] is None:
+        with _lock:
+            if _pool["executor"] is None:
+                if INFERENCE_BACKEND == "process":
+                    _pool["executor"] = ProcessPoolExecutor(
+                        max_workers=INFERENCE_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                    )
+                else:
+                    _pool["executor"] = ThreadPoolExecutor(
+                        max_workers=INFERENCE_WORKERS,
+                        thread_name_prefix="inference",
+                    )
+    return _pool["executor"]
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    Await CPU-bound work (decode, detection, embedding) on the configured
+    backend. With the process backend, fn and its arguments must be
+    picklable, so pass bytes rather than decoded images.
+    """
+    if INFERENCE_BACKEND == "inline":
+        return fn(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_io(fn, *args, **kwargs):
+    # blocking network clients (Cloudinary, Redis, requests) go to a thread
+    if INFERENCE_BACKEND == "inline":
+        return fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+async def warmup_backend():
+    """
+    Preload the models wherever inference will run: once per worker process
+    for the process backend, otherwise once in this process.
+    """
+    from ..pipeline import warmup
+
+    if INFERENCE_BACKEND == "process":
+        # one job per worker so every process starts (its initializer warms it up)
+        await asyncio.gather(*[run_cpu(int) for _ in range(INFERENCE_WORKERS)])
+    else:
+        await asyncio.to_thread(warmup)
@@ -0,0 +1,85 @@
+# src/backend/app/services/image_io.py
+import cv2
+import numpy as np
+
+# libjpeg can scale the DCT by 1/2, 1/4 or 1/8 while decoding, which skips
+# most of the work (and memory) for oversized photos
+REDUCED_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+# start-of-frame markers (baseline, progressive, lossless, arithmetic variants)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class InvalidImage(ValueError):
+    """The uploaded bytes could not be decoded as an image."""
+
+
+def decode_image(img_bytes):
+    # BGR image, or None if the bytes aren't a readable image
+    arr = np.frombuffer(img_bytes, np.uint8)
+    if arr.size == 0:
+        return None
+    return cv2.imdecode(arr, cv2.IMREAD_COLOR)
+
+
+def jpeg_size(img_bytes):
+    """
+    (width, height) from the JPEG frame header without decoding anything,
+    or None if the bytes aren't a JPEG we can read the header of.
+    """
+    data = memoryview(img_bytes)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # markers without a length
+            i += 2
+            continue
+        length = (data[i + 2] << 8) | data[i + 3]
+        if marker in _SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        if marker == 0xDA:  # start of scan: no frame header before the image data
+            return None
+        i += 2 + length
+    return None
+
+
+def reduction_factor(img_bytes, min_side):
+    # largest DCT scale that still leaves the longest side at >= min_side pixels
+    size = jpeg_size(img_bytes)
+    if size is None:
+        return 1
+    longest = max(size)
+    for factor in (8, 4, 2):
+        if longest // factor >= min_side:
+            return factor
+    return 1
+
+
+def decode_image_reduced(img_bytes, min_side):
+    """
+    Decode oversized JPEGs at 1/2, 1/4 or 1/8 scale, keeping the longest
+    side at least `min_side`. Returns (image or None, factor); multiply
+    coordinates by factor to get back to the full-resolution image.
+    Other formats and small JPEGs decode at full size with factor 1.
+    """
+    factor = reduction_factor(img_bytes, min_side)
+    if factor == 1:
+        return decode_image(img_bytes), 1
+    arr = np.frombuffer(img_bytes, np.uint8)
+    return cv2.imdecode(arr, REDUCED_FLAGS[factor]), factor
@@ -0,0 +1,266 @@
+# src/backend/app/services/inference_server.py
+#
+# Optional shared inference process. One server owns the SCRFD and ArcFace
+# sessions; API workers started with INFERENCE_SERVER_SOCKET set send it
+# their images over a Unix socket instead of loading models themselves.
+#
+# Start it before the API workers (from the project root):
+#   INFERENCE_SERVER_SOCKET=/tmp/reunite-inference.sock \
+#       python -m src.backend.app.services.inference_server
+#
+# Wire format (both directions): 4-byte big-endian header length, a JSON
+# header, then the raw payload bytes the header describes. Image bytes and
+# pixel/embedding buffers are sent and received as-is (sendall / recv_into
+# on memoryviews), so nothing is pickled or copied into Python objects.
+import os
+import json
+import socket
+import struct
+import threading
+import socketserver
+import numpy as np
+from .image_io import InvalidImage, decode_image
+from .quality import QualityRejected
+from ..config import INFERENCE_SERVER_SOCKET
+
+_HEADER = struct.Struct("!I")
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    while n:
+        got = sock.recv_into(view[-n:], n)
+        if got == 0:
+            raise ConnectionError("inference socket closed")
+        n -= got
+    return buf
+
+
+def _send_frame(sock, header, buffers=()):
+    head = json.dumps(header).encode()
+    sock.sendall(_HEADER.pack(len(head)) + head)
+    for b in buffers:
+        sock.sendall(memoryview(b).cast("B"))
+
+
+def _recv_frame(sock):
+    (head_len,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, head_len))
+    payload = _recv_exact(sock, header.get("payload_bytes", 0))
+    return header, payload
+
+
+# ---------------------------------------------------------------- client
+
+class InferenceClient:
+    """
+    Talks to the inference server. One connection per calling thread,
+    re-opened once if the server restarted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _sock(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _drop(self):
+        # close this thread's connection (its state is unknown after an error)
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _call(self, header, buffers):
+        header["payload_bytes"] = sum(memoryview(b).nbytes for b in buffers)
+        for attempt in (0, 1):
+            try:
+                sock = self._sock()
+                _send_frame(sock, header, buffers)
+                resp, payload = _recv_frame(sock)
+                break
+            except (ConnectionError, OSError):
+                self._drop()
+                if attempt:
+                    raise
+        if not resp.get("ok"):
+            raise RuntimeError(f"inference server error: {resp.get('error')}")
+        return resp, payload
+
+    def _embeddings(self, resp, payload):
+        emb = np.frombuffer(payload, dtype=np.float32).reshape(-1, resp["dim"])
+        out, j = [], 0
+        for present, rejected in zip(resp["present"], resp["rejected"]):
+            if present:
+                out.append(emb[j].tolist())
+                j += 1
+            elif rejected is not None:
+                out.append(QualityRejected(rejected))
+            else:
+                out.append(None)
+        return out
+
+    def _pixels(self, op, images, **fields):
+        arrays = [np.ascontiguousarray(img) for img in images]
+        header = {
+            "op": op,
+            "items": [{"shape": list(a.shape), "dtype": str(a.dtype), "nbytes": a.nbytes} for a in arrays],
+            **fields,
+        }
+        return self._call(header, arrays)
+
+    def embed_images(self, images, quality=None):
+        # decoded BGR arrays -> one embedding list, None or QualityRejected per image
+        return self._embeddings(*self._pixels("embed_pixels", images, quality=quality))
+
+    def detect(self, images, score_thresh):
+        # decoded BGR arrays -> every detection per image (see detector.detect_faces_batch)
+        return self._pixels("detect_pixels", images, score_thresh=score_thresh)[0]["detections"]
+
+    def embed_faces(self, faces):
+        # 112x112 face chips -> (N, 512) float32 embeddings
+        resp, payload = self._pixels("embed_faces", faces)
+        return np.frombuffer(payload, dtype=np.float32).reshape(-1, resp["dim"])
+
+    def embed_encoded(self, blobs, quality=None):
+        """
+        Encoded image bytes -> embedding list, None (no face), or an
+        InvalidImage (undecodable) / QualityRejected instance per image.
+        """
+        header = {"op": "embed_encoded", "quality": quality, "items": [{"nbytes": len(b)} for b in blobs]}
+        resp, payload = self._call(header, blobs)
+        out = self._embeddings(resp, payload)
+        return [InvalidImage("Invalid image file") if bad else emb for emb, bad in zip(out, resp["invalid"])]
+
+    def embed_all_faces(self, blob, quality=None):
+        # encoded image -> list of face dicts (see pipeline.embed_all_faces_bytes) or InvalidImage
+        resp, payload = self._call({"op": "embed_all_faces", "quality": quality}, [blob])
+        if resp.get("invalid"):
+            return InvalidImage("Invalid image file")
+        for face, emb in zip(resp["faces"], self._embeddings(resp, payload)):
+            face["embedding"] = emb
+        return resp["faces"]
+
+    def ping(self):
+        return self._call({"op": "ping"}, [])[0]
+
+
+_client = {"client": None}
+
+
+def get_inference_client():
+    # None when models run in this process (INFERENCE_SERVER_SOCKET unset)
+    if not INFERENCE_SERVER_SOCKET:
+        return None
+    if _client["client"] is None:
+        _client["client"] = InferenceClient(INFERENCE_SERVER_SOCKET)
+    return _client["client"]
+
+
+# ---------------------------------------------------------------- server
+
+def _split(payload, items):
+    views, offset = [], 0
+    view = memoryview(payload)
+    for item in items:
+        views.append(view[offset:offset + item["nbytes"]])
+        offset += item["nbytes"]
+    return views
+
+
+def _images(payload, items):
+    return [
+        np.frombuffer(view, dtype=item["dtype"]).reshape(item["shape"])
+        for view, item in zip(_split(payload, items), items)
+    ]
+
+
+def _embedding_response(results):
+    present = [isinstance(r, list) for r in results]
+    rejected = [r.detail if isinstance(r, QualityRejected) else None for r in results]
+    emb = np.asarray([r for r in results if isinstance(r, list)], dtype=np.float32)
+    dim = emb.shape[1] if emb.size else 512
+    return {"ok": True, "present": present, "rejected": rejected, "dim": dim, "payload_bytes": emb.nbytes}, [emb]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        from .. import pipeline
+
+        while True:
+            try:
+                header, payload = _recv_frame(self.request)
+            except ConnectionError:
+                return
+
+            try:
+                op = header["op"]
+                if op == "ping":
+                    resp, buffers = {"ok": True, "pid": os.getpid()}, []
+                elif op == "embed_pixels":
+                    images = _images(payload, header["items"])
+                    resp, buffers = _embedding_response(pipeline._extract_embeddings_batch_local(images, header.get("quality")))
+                elif op == "detect_pixels":
+                    images = _images(payload, header["items"])
+                    detections = pipeline._detect_frames_local(images, header["score_thresh"])
+                    resp, buffers = {"ok": True, "detections": detections}, []
+                elif op == "embed_faces":
+                    emb = pipeline._embed_faces_local(_images(payload, header["items"]))
+                    resp, buffers = {"ok": True, "dim": emb.shape[1], "payload_bytes": emb.nbytes}, [emb]
+                elif op == "embed_encoded":
+                    blobs = _split(payload, header["items"])
+                    results = pipeline._embed_images_bytes_batch_local(blobs, header.get("quality"))
+                    resp, buffers = _embedding_response(results)
+                    resp["invalid"] = [isinstance(r, InvalidImage) for r in results]
+                elif op == "embed_all_faces":
+                    img = decode_image(payload)
+                    if img is None:
+                        resp, buffers = {"ok": True, "invalid": True}, []
+                    else:
+                        faces = pipeline._embed_all_faces_local(img, header.get("quality"))
+                        resp, buffers = _embedding_response([f["embedding"] for f in faces])
+                        resp["faces"] = [{k: f[k] for k in ("box", "score", "rejected")} for f in faces]
+                else:
+                    resp, buffers = {"ok": False, "error": f"unknown op {op}"}, []
+            except Exception as e:
+                resp, buffers = {"ok": False, "error": str(e)}, []
+
+            resp.setdefault("payload_bytes", 0)
+            _send_frame(self.request, resp, buffers)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path=INFERENCE_SERVER_SOCKET):
+    from ..pipeline import _warmup_local
+
+    if not path:
+        raise SystemExit("Set INFERENCE_SERVER_SOCKET to the socket path to listen on")
+    if os.path.exists(path):
+        os.unlink(path)
+
+    print("➡ Loading models ...")
+    _warmup_local()
+    with _Server(path, _Handler) as server:
+        print(f"✓ Inference server listening on {path} (pid {os.getpid()})")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,373 @@
+# src/backend/app/services/local_store.py
+#
+# In-process face gallery: L2-normalized float32 vectors in a memory-mapped
+# file, payloads in an append-only JSON log, exact top-k by matrix multiply
+# and an optional IVF (inverted file) index for large galleries.
+#
+#   <path>/vectors.f32   capacity x dim float32, row i = point i
+#   <path>/log.jsonl     one line per upsert / delete / set_payload, replayed on open
+#   <path>/ivf.npz       IVF centroids and list boundaries (index="ivf"); building
+#                        the index rewrites the vectors in list order so every
+#                        list is one contiguous block of rows
+import os
+import re
+import json
+import operator
+import threading
+import numpy as np
+from .vector_store import VectorStore, Hit
+
+MIN_CAPACITY = 1024
+IVF_MIN_POINTS_PER_LIST = 40  # below nlist * this, exact search is used instead
+IVF_ITERATIONS = 10
+ASSIGN_CHUNK = 65536
+RANGE_OPS = {"gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _words(text):
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def _matches(value, cond):
+    # one filter_payload condition (see VectorStore) against a payload value
+    if isinstance(cond, dict):
+        if "text" in cond:
+            return isinstance(value, str) and _words(cond["text"]) <= _words(value)
+        try:
+            return value is not None and all(
+                RANGE_OPS[op](value, bound) for op, bound in cond.items() if bound is not None
+            )
+        except TypeError:
+            return False
+    if isinstance(cond, (list, tuple)):
+        return value in cond
+    return value == cond
+
+
+def _top_k(scores, k):
+    # indices of the k largest scores, best first
+    if k < len(scores):
+        idx = np.argpartition(-scores, k)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx])]
+
+
+class LocalStore(VectorStore):
+    """
+    VectorStore kept in this process. Exact search scores every stored face
+    with one matmul. With index="ivf", vectors are clustered into `nlist`
+    lists (spherical k-means) and each query only scores the `nprobe` closest
+    lists; the index is built on first search once there are enough points,
+    or explicitly with build_index().
+    """
+
+    def __init__(self, path, dim=512, index="flat", nlist=1024, nprobe=16):
+        self.path = path
+        self.dim = dim
+        self.index = index
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._log_path = os.path.join(path, "log.jsonl")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        self._load()
+
+    # ------------------------------------------------------------ storage
+
+    def _open_vectors(self, capacity):
+        size = capacity * self.dim * 4
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def _load(self):
+        existing = os.path.getsize(self._vectors_path) // (self.dim * 4) if os.path.exists(self._vectors_path) else 0
+        self._open_vectors(max(existing, MIN_CAPACITY))
+
+        ivf = None
+        if self.index == "ivf" and os.path.exists(self._ivf_path):
+            ivf = dict(np.load(self._ivf_path))
+
+        self._ids, self._payloads = [], []
+        self._rows = {}
+        alive, touched = [], []
+        if os.path.exists(self._log_path):
+            with open(self._log_path) as f:
+                for line_no, line in enumerate(f):
+                    entry = json.loads(line)
+                    if entry["op"] == "upsert":
+                        if ivf is not None and line_no >= ivf["log_lines"]:
+                            touched.append(entry["row"])
+                        row = entry["row"]
+                        while len(self._ids) <= row:
+                            self._ids.append(None)
+                            self._payloads.append(None)
+                            alive.append(False)
+                        self._ids[row], self._payloads[row], alive[row] = entry["id"], entry["payload"], True
+                        self._rows[entry["id"]] = row
+                    elif entry["op"] == "delete":
+                        row = self._rows.pop(entry["id"], None)
+                        if row is not None:
+                            alive[row], self._payloads[row] = False, None
+                    elif entry["op"] == "set_payload":
+                        row = self._rows.get(entry["id"])
+                        if row is not None:
+                            self._payloads[row] = {**self._payloads[row], **entry["payload"]}
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._alive[:len(alive)] = alive
+        self._masks = {}
+
+        self._centroids = None
+        if ivf is not None:
+            self._set_ivf(ivf["centroids"], ivf["bounds"])
+            # rows written after the build go to the lists' overflow
+            if touched:
+                self._assign_rows(np.unique(touched))
+
+    @property
+    def _n(self):
+        return len(self._ids)
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity != self._capacity:
+            self._vectors.flush()
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:self._capacity] = self._alive
+            self._alive = alive
+            if self._centroids is not None:
+                assign = np.full(capacity, -1, dtype=np.int32)
+                assign[:self._capacity] = self._assign
+                self._assign = assign
+            self._open_vectors(capacity)
+
+    def _append_log(self, entries):
+        with open(self._log_path, "a") as f:
+            f.write("".join(json.dumps(e) + "\n" for e in entries))
+
+    # ------------------------------------------------------------ writes
+
+    def upsert(self, points, wait=True):
+        # always applied before returning; `wait` is for Qdrant compatibility
+        points = list(points)
+        if not points:
+            return
+        vectors = _normalize([vec for _, vec, _ in points])
+        with self._lock:
+            entries, rows = [], []
+            for (pid, _, payload), vec in zip(points, vectors):
+                pid = str(pid)
+                row = self._rows.get(pid)
+                if row is None:
+                    row = self._n
+                    self._grow(row + 1)
+                    self._ids.append(pid)
+                    self._payloads.append(None)
+                    self._rows[pid] = row
+                self._vectors[row] = vec
+                self._payloads[row] = payload
+                self._alive[row] = True
+                rows.append(row)
+                entries.append({"op": "upsert", "id": pid, "row": row, "payload": payload})
+            self._vectors.flush()
+            self._append_log(entries)
+            self._masks = {}
+            if self._centroids is not None:
+                self._assign_rows(np.array(rows))
+
+    def delete(self, ids):
+        with self._lock:
+            entries = []
+            for pid in map(str, ids):
+                row = self._rows.pop(pid, None)
+                if row is None:
+                    continue
+                self._alive[row] = False
+                self._payloads[row] = None
+                entries.append({"op": "delete", "id": pid})
+            if entries:
+                self._append_log(entries)
+                self._masks = {}
+
+    def set_payload(self, payload, filter_payload):
+        with self._lock:
+            rows = np.nonzero(self._filter_mask(filter_payload))[0]
+            entries = []
+            for row in rows:
+                self._payloads[row] = {**self._payloads[row], **payload}
+                entries.append({"op": "set_payload", "id": self._ids[row], "payload": payload})
+            if entries:
+                self._append_log(entries)
+                self._masks = {}
+
+    def compact(self):
+        """
+        Drop deleted rows: rewrites the vector file and log with only live
+        points (row numbers change, so an IVF index is rebuilt on next search).
+        """
+        with self._lock:
+            self._rewrite(np.nonzero(self._alive[:self._n])[0])
+
+    def _rewrite(self, rows):
+        # start the files over with just `rows`, in that order
+        vectors = np.array(self._vectors[rows])
+        points = [(self._ids[r], vectors[i], self._payloads[r]) for i, r in enumerate(rows)]
+        del self._vectors
+        for p in (self._vectors_path, self._log_path, self._ivf_path):
+            if os.path.exists(p):
+                os.remove(p)
+        self._load()
+        self.upsert(points)
+
+    # ------------------------------------------------------------ reads
+
+    def _filter_mask(self, filter_payload):
+        # live rows matching every {field: condition}; cached until the next write
+        n = self._n
+        mask = self._alive[:n].copy()
+        for key, value in (filter_payload or {}).items():
+            cache_key = (key, json.dumps(value, sort_keys=True))
+            if cache_key not in self._masks:
+                self._masks[cache_key] = np.fromiter(
+                    (p is not None and _matches(p.get(key), value) for p in self._payloads), dtype=bool, count=n
+                )
+            mask &= self._masks[cache_key]
+        return mask
+
+    def _hits(self, rows, scores):
+        return [Hit(self._ids[r], float(s), self._payloads[r]) for r, s in zip(rows, scores)]
+
+    def search_batch(self, vectors, top_k=5, filter_payload=None):
+        queries = _normalize(vectors)
+        with self._lock:
+            n = self._n
+            if n == 0:
+                return [[] for _ in queries]
+            mask = self._filter_mask(filter_payload)
+            if self.index == "ivf":
+                self._ensure_ivf()
+            if self._centroids is not None:
+                return [self._search_ivf(q, top_k, mask) for q in queries]
+
+            # exact: one (queries x points) matmul
+            scores = queries @ self._vectors[:n].T
+            scores[:, ~mask] = -np.inf
+            out = []
+            for row_scores in scores:
+                idx = _top_k(row_scores, top_k)
+                idx = idx[np.isfinite(row_scores[idx])]
+                out.append(self._hits(idx, row_scores[idx]))
+            return out
+
+    def scroll(self, limit=100, offset=None, with_vectors=False):
+        with self._lock:
+            start = int(offset or 0)
+            rows = np.nonzero(self._alive[start:self._n])[0][:limit + 1] + start
+            page, more = rows[:limit], rows[limit:]
+            points = [
+                Hit(self._ids[r], None, self._payloads[r], self._vectors[r].tolist() if with_vectors else None)
+                for r in page
+            ]
+            return points, (int(more[0]) if len(more) else None)
+
+    def count(self, filter_payload=None):
+        with self._lock:
+            return int(self._filter_mask(filter_payload).sum())
+
+    # ------------------------------------------------------------ IVF
+
+    def _set_ivf(self, centroids, bounds):
+        # list c = rows bounds[c]:bounds[c + 1], plus overflow rows written since
+        self._centroids = centroids.astype(np.float32)
+        self._bounds = bounds.astype(np.int64)
+        self._assign = np.full(self._capacity, -1, dtype=np.int32)
+        self._assign[:self._bounds[-1]] = np.repeat(np.arange(len(centroids), dtype=np.int32), np.diff(self._bounds))
+        self._overflow = [np.empty(0, dtype=np.int64) for _ in range(len(centroids))]
+
+    def _nearest_centroid(self, vectors):
+        return np.concatenate([
+            np.argmax(vectors[i:i + ASSIGN_CHUNK] @ self._centroids.T, axis=1)
+            for i in range(0, len(vectors), ASSIGN_CHUNK)
+        ]).astype(np.int32)
+
+    def _assign_rows(self, rows):
+        clusters = self._nearest_centroid(self._vectors[rows])
+        self._assign[rows] = clusters
+        # a row re-upserted into the list whose block already holds it is scored there
+        in_block = (rows >= self._bounds[clusters]) & (rows < self._bounds[clusters + 1])
+        rows, clusters = rows[~in_block], clusters[~in_block]
+        for c in np.unique(clusters):
+            self._overflow[c] = np.union1d(self._overflow[c], rows[clusters == c])
+
+    def _ensure_ivf(self):
+        if self._centroids is None and int(self._alive[:self._n].sum()) >= self.nlist * IVF_MIN_POINTS_PER_LIST:
+            self.build_index()
+
+    def build_index(self, nlist=None, iterations=IVF_ITERATIONS, seed=0):
+        """
+        Cluster the live vectors with spherical k-means into `nlist` lists,
+        rewrite the store in list order (dropping deleted rows, like
+        compact()) and save the index next to the vectors.
+        """
+        with self._lock:
+            nlist = nlist or self.nlist
+            live = np.nonzero(self._alive[:self._n])[0]
+            if len(live) < nlist:
+                return
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live, size=min(len(live), nlist * 256), replace=False))
+            X = np.array(self._vectors[sample])
+
+            centroids = X[rng.choice(len(X), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(X @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, X)
+                empty = np.nonzero(np.bincount(labels, minlength=nlist) == 0)[0]
+                sums[empty] = X[rng.choice(len(X), size=len(empty), replace=False)]
+                centroids = _normalize(sums)
+
+            self._centroids = centroids
+            labels = self._nearest_centroid(self._vectors[live])
+            order = np.argsort(labels, kind="stable")
+            self._centroids = None
+            self._rewrite(live[order])
+
+            bounds = np.searchsorted(labels[order], np.arange(nlist + 1))
+            self._set_ivf(centroids, bounds)
+            with open(self._log_path) as f:
+                log_lines = sum(1 for _ in f)
+            np.savez(self._ivf_path, centroids=centroids, bounds=bounds, log_lines=log_lines)
+            print(f"✓ Built IVF index: {nlist} lists over {len(live)} vectors")
+
+    def _search_ivf(self, query, top_k, mask):
+        all_rows, all_scores = [], []
+        for c in _top_k(self._centroids @ query, self.nprobe):
+            # the list's block is scored as one contiguous slice, its overflow by gather
+            start, end = self._bounds[c], self._bounds[c + 1]
+            rows = np.concatenate([np.arange(start, end), self._overflow[c]])
+            scores = np.concatenate([self._vectors[start:end] @ query, self._vectors[self._overflow[c]] @ query])
+            # rows re-upserted into another list still sit in their old block until rebuilt
+            keep = mask[rows] & (self._assign[rows] == c)
+            all_rows.append(rows[keep])
+            all_scores.append(scores[keep])
+        rows, scores = np.concatenate(all_rows), np.concatenate(all_scores)
+        if len(rows) == 0:
+            return []
+        idx = _top_k(scores, top_k)
+        return self._hits(rows[idx], scores[idx])
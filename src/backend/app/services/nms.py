@@ -0,0 +1,134 @@
+# src/backend/app/services/nms.py
+
+import cv2
+import numpy as np
+from ..config import NMS_PRE_TOP_K, NMS_MAX_DET, NMS_METHOD, NMS_SOFT_SIGMA
+
+
+def _top_k(scores, k):
+    # indices of the k best scores, sorted high -> low
+    if k and scores.size > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.size)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _areas(boxes):
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def _iou(box, area, boxes, areas):
+    # IoU of one x1, y1, x2, y2 box against (N, 4) boxes
+    w = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    h = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = w * h
+    return inter / (area + areas - inter + 1e-9)
+
+
+def iou_matrix(a, b):
+    # pairwise IoU of (N, 4) and (M, 4) x1, y1, x2, y2 boxes, by broadcasting
+    w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = w * h
+    return inter / (_areas(a)[:, None] + _areas(b)[None, :] - inter + 1e-9)
+
+
+def _hard_nms_numpy(boxes, thresh, max_det):
+    """
+    Greedy NMS as a per-kept-box loop: boxes are already sorted by score and
+    each kept box suppresses the later ones it overlaps. Stops at max_det,
+    which is where it wins over a full N x N IoU matrix (that costs more
+    than the loop for ~1000 candidates).
+    """
+    # contiguous columns; iou > t  <=>  inter * (1 + t) > t * (area_i + area_j)
+    x1, y1, x2, y2 = (np.ascontiguousarray(c) for c in boxes.T)
+    areas = (x2 - x1) * (y2 - y1)
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for i in range(len(boxes)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        if len(keep) == max_det:
+            break
+        j = i + 1
+        # in-place ops: this loop is all ufunc-call overhead at these sizes
+        w = np.minimum(x2[i], x2[j:])
+        w -= np.maximum(x1[i], x1[j:])
+        np.maximum(w, 0, out=w)
+        h = np.minimum(y2[i], y2[j:])
+        h -= np.maximum(y1[i], y1[j:])
+        np.maximum(h, 0, out=h)
+        w *= h
+        suppressed[j:] |= w * (1 + thresh) > thresh * (areas[i] + areas[j:])
+    return np.array(keep, dtype=np.int64)
+
+
+def _hard_nms_cv2(boxes, scores, thresh, max_det):
+    xywh = np.concatenate([boxes[:, :2], boxes[:, 2:4] - boxes[:, :2]], axis=1)
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, thresh, top_k=max_det or 0)
+    return np.asarray(keep, dtype=np.int64).reshape(-1)
+
+
+def nms(boxes, scores, thresh=0.45, pre_top_k=NMS_PRE_TOP_K, max_det=NMS_MAX_DET, backend="cv2"):
+    """
+    Greedy hard NMS. Only the pre_top_k best candidates are considered and at
+    most max_det boxes are kept (0 disables either cap).
+    Returns indices into the original arrays, best score first.
+    """
+    if scores.size == 0:
+        return np.empty((0,), dtype=np.int64)
+
+    order = _top_k(scores, pre_top_k)
+    boxes = boxes[order].astype(np.float32, copy=False)
+
+    if backend == "cv2":
+        keep = _hard_nms_cv2(boxes, scores[order], thresh, max_det)
+    else:
+        keep = _hard_nms_numpy(boxes, thresh, max_det)
+    return order[keep]
+
+
+def soft_nms(boxes, scores, score_thresh, pre_top_k=NMS_PRE_TOP_K, max_det=NMS_MAX_DET,
+             sigma=NMS_SOFT_SIGMA):
+    """
+    Gaussian soft-NMS: overlapping boxes get their score decayed by
+    exp(-iou^2 / sigma) instead of being dropped outright; boxes whose decayed
+    score falls below score_thresh (the detection threshold) are removed.
+    Returns (indices into the original arrays, decayed scores for them).
+    """
+    if scores.size == 0:
+        return np.empty((0,), dtype=np.int64), np.empty((0,), dtype=np.float32)
+
+    order = _top_k(scores, pre_top_k)
+    boxes = boxes[order].astype(np.float32, copy=False)
+    areas = _areas(boxes)
+    decayed = scores[order].astype(np.float32).copy()
+    alive = np.ones(len(order), dtype=bool)
+
+    keep, keep_scores = [], []
+    limit = max_det or len(order)
+    while alive.any() and len(keep) < limit:
+        i = int(np.argmax(np.where(alive, decayed, -np.inf)))
+        keep.append(i)
+        keep_scores.append(decayed[i])
+        alive[i] = False
+
+        iou = _iou(boxes[i], areas[i], boxes[alive], areas[alive])
+        decayed[alive] *= np.exp(-(iou ** 2) / sigma)
+        alive &= decayed >= score_thresh
+
+    return order[np.array(keep, dtype=np.int64)], np.array(keep_scores, dtype=np.float32)
+
+
+def run_nms(boxes, scores, score_thresh, thresh=0.45, method=NMS_METHOD):
+    """
+    Dispatch to the configured NMS method. Returns (keep indices, scores).
+    `thresh` is the IoU threshold of hard NMS; soft-NMS drops boxes whose
+    decayed score falls below `score_thresh`.
+    """
+    if method == "soft":
+        return soft_nms(boxes, scores, score_thresh)
+    keep = nms(boxes, scores, thresh, backend="numpy" if method == "numpy" else "cv2")
+    return keep, scores[keep]
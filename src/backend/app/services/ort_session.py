@@ -0,0 +1,133 @@
+# src/backend/app/services/ort_session.py
+import threading
+
+# onnxruntime is imported on first use so processes that never run a model
+# (admin-only workers, CLI scripts, tests) don't pay for it at startup
+EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+
+GRAPH_OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+# name -> LazySession / (model path, requested settings, session) for diagnostics
+_sessions = {}
+
+
+def build_session_options(settings):
+    import onnxruntime as ort
+
+    so = ort.SessionOptions()
+    so.intra_op_num_threads = settings["intra_op_num_threads"]
+    so.inter_op_num_threads = settings["inter_op_num_threads"]
+    so.execution_mode = getattr(ort.ExecutionMode, EXECUTION_MODES[settings["execution_mode"]])
+    so.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPT_LEVELS[settings["graph_optimization_level"]])
+    so.enable_cpu_mem_arena = settings["enable_cpu_mem_arena"]
+    so.enable_mem_pattern = settings["enable_mem_pattern"]
+
+    spinning = "1" if settings["allow_spinning"] else "0"
+    so.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+    so.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+    return so
+
+
+def _new_session(model_path, settings):
+    import onnxruntime as ort
+
+    return ort.InferenceSession(
+        model_path,
+        sess_options=build_session_options(settings),
+        providers=["CPUExecutionProvider"],
+    )
+
+
+def create_session(name, model_path, settings):
+    # eager session (offline tools); serving code uses LazySession
+    session = _new_session(model_path, settings)
+    _sessions[name] = (model_path, settings, session)
+    return session
+
+
+class LazySession:
+    """
+    An ONNX model whose session is created on first use (or by load()).
+    Safe to call from several threads; the model is loaded once.
+    """
+
+    def __init__(self, name, model_path, settings):
+        self.name = name
+        self.model_path = model_path
+        self.settings = settings
+        self._session = None
+        self._lock = threading.Lock()
+        _sessions[name] = self
+
+    def load(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = _new_session(self.model_path, self.settings)
+        return self._session
+
+    @property
+    def loaded(self):
+        return self._session is not None
+
+    @property
+    def session(self):
+        return self.load()
+
+    @property
+    def input_name(self):
+        return self.session.get_inputs()[0].name
+
+    @property
+    def output_name(self):
+        return self.session.get_outputs()[0].name
+
+    @property
+    def input_type(self):
+        return self.session.get_inputs()[0].type
+
+    @property
+    def batch_supported(self):
+        # exports with a fixed batch dimension of 1 can't take stacked inputs
+        return self.session.get_inputs()[0].shape[0] != 1
+
+
+def describe_sessions():
+    """
+    Effective ONNX Runtime settings of every model known to this process.
+    Models that haven't been loaded yet only report their requested settings.
+    """
+    import onnxruntime as ort
+
+    out = {}
+    for name, entry in _sessions.items():
+        if isinstance(entry, LazySession):
+            model_path, settings = entry.model_path, entry.settings
+            session = entry._session
+        else:
+            model_path, settings, session = entry
+
+        out[name] = {"model_path": model_path, "loaded": session is not None, "requested": settings}
+        if session is None:
+            continue
+
+        so = session.get_session_options()
+        out[name]["providers"] = session.get_providers()
+        out[name]["effective"] = {
+            "intra_op_num_threads": so.intra_op_num_threads,
+            "inter_op_num_threads": so.inter_op_num_threads,
+            "execution_mode": str(so.execution_mode),
+            "graph_optimization_level": str(so.graph_optimization_level),
+            "enable_cpu_mem_arena": so.enable_cpu_mem_arena,
+            "enable_mem_pattern": so.enable_mem_pattern,
+            "allow_spinning": so.get_session_config_entry("session.intra_op.allow_spinning") == "1",
+        }
+    return {"onnxruntime_version": ort.__version__, "sessions": out}
@@ -1,40 +1,216 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
-from ..config import QDRANT_URL, QDRANT_API_KEY
-import os
-
-client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, prefer_grpc=False)
+import asyncio
+import threading
+from .vector_store import VectorStore
+from ..config import (
+    QDRANT_URL, QDRANT_API_KEY, QDRANT_GRPC, QDRANT_GRPC_PORT, QDRANT_TIMEOUT, QDRANT_POOL_SIZE,
+    QDRANT_QUANTIZATION, QDRANT_QUANTIZATION_ALWAYS_RAM, QDRANT_SCALAR_QUANTILE, QDRANT_HNSW_M,
+    QDRANT_HNSW_EF_CONSTRUCT, QDRANT_VECTORS_ON_DISK, QDRANT_HNSW_EF, QDRANT_OVERSAMPLING, QDRANT_RESCORE,
+)
 
 COLLECTION = "faces_collection"
 
-def search_vectors(embedding, top_k=5, filter_payload=None):
-    """
-    embedding: list[float]
-    filter_payload: dict (e.g., {"verified": True})
-    returns list of hits with id, score (distance) and payload
-    """
-    from qdrant_client.http.models import Filter, FieldCondition, MatchValue
-    qfilter = None
-    if filter_payload:
-        # Build AND filters for matching payloads (simple)
-        must = []
-        for k, v in filter_payload.items():
-            must.append(FieldCondition(key=k, match=MatchValue(value=v)))
-        qfilter = Filter(must=must)
-
-
-    res = client.search(
-        collection_name=COLLECTION,
-        query_vector=embedding,
+_qdrant = {"client": None, "async_client": None}
+_lock = threading.Lock()
+
+def _client_kwargs():
+    import httpx
+    # keep REST connections alive between requests instead of reconnecting per call
+    limits = httpx.Limits(max_connections=QDRANT_POOL_SIZE, max_keepalive_connections=QDRANT_POOL_SIZE)
+    return dict(
+        url=QDRANT_URL,
+        api_key=QDRANT_API_KEY,
+        prefer_grpc=QDRANT_GRPC,
+        grpc_port=QDRANT_GRPC_PORT,
+        timeout=QDRANT_TIMEOUT,
+        limits=limits,
+    )
+
+def get_client():
+    # qdrant_client is heavy to import; load and connect on first use
+    if _qdrant["client"] is None:
+        with _lock:
+            if _qdrant["client"] is None:
+                from qdrant_client import QdrantClient
+                _qdrant["client"] = QdrantClient(**_client_kwargs())
+    return _qdrant["client"]
+
+def get_async_client():
+    # for request handlers: awaits the round trip instead of blocking the event loop
+    if _qdrant["async_client"] is None:
+        with _lock:
+            if _qdrant["async_client"] is None:
+                from qdrant_client import AsyncQdrantClient
+                _qdrant["async_client"] = AsyncQdrantClient(**_client_kwargs())
+    return _qdrant["async_client"]
+
+async def close_async_client():
+    client = _qdrant["async_client"]
+    _qdrant["async_client"] = None
+    if client is not None:
+        await client.close()
+
+def _condition(key, value):
+    from qdrant_client.http import models
+    if isinstance(value, dict):
+        if "text" in value:
+            return models.FieldCondition(key=key, match=models.MatchText(text=value["text"]))
+        bounds = {op: v for op, v in value.items() if v is not None}
+        # string bounds are ISO dates (datetime index), anything else numeric
+        if any(isinstance(v, str) for v in bounds.values()):
+            return models.FieldCondition(key=key, range=models.DatetimeRange(**bounds))
+        return models.FieldCondition(key=key, range=models.Range(**bounds))
+    if isinstance(value, (list, tuple)):
+        return models.FieldCondition(key=key, match=models.MatchAny(any=list(value)))
+    return models.FieldCondition(key=key, match=models.MatchValue(value=value))
+
+def _build_filter(filter_payload):
+    from qdrant_client.http.models import Filter
+    if not filter_payload:
+        return None
+    # AND of all conditions; Qdrant applies it inside the HNSW search, not after
+    return Filter(must=[_condition(k, v) for k, v in filter_payload.items()])
+
+def quantization_config():
+    from qdrant_client.http import models
+    if QDRANT_QUANTIZATION == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=QDRANT_SCALAR_QUANTILE, always_ram=QDRANT_QUANTIZATION_ALWAYS_RAM
+        ))
+    if QDRANT_QUANTIZATION == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=QDRANT_QUANTIZATION_ALWAYS_RAM))
+    if QDRANT_QUANTIZATION != "none":
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION: {QDRANT_QUANTIZATION}")
+    return None
+
+def hnsw_config():
+    from qdrant_client.http import models
+    return models.HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+def vectors_config():
+    from qdrant_client.http import models
+    return models.VectorParams(size=512, distance=models.Distance.COSINE, on_disk=QDRANT_VECTORS_ON_DISK)
+
+def _search_params():
+    from qdrant_client.http import models
+    quantization = None
+    if QDRANT_QUANTIZATION != "none":
+        quantization = models.QuantizationSearchParams(
+            rescore=QDRANT_RESCORE, oversampling=QDRANT_OVERSAMPLING or None
+        )
+    return models.SearchParams(hnsw_ef=QDRANT_HNSW_EF or None, quantization=quantization)
+
+def _search_requests(vectors, top_k, filter_payload):
+    from qdrant_client.http.models import SearchRequest
+    qfilter = _build_filter(filter_payload)
+    params = _search_params()
+    return [
+        SearchRequest(vector=list(v), limit=top_k, filter=qfilter, params=params, with_payload=True, with_vector=False)
+        for v in vectors
+    ]
+
+def _groups_args(vector, top_k, group_by, filter_payload):
+    return dict(
+        query_vector=list(vector),
+        group_by=group_by,
         limit=top_k,
+        group_size=1,
+        query_filter=_build_filter(filter_payload),
+        search_params=_search_params(),
         with_payload=True,
         with_vectors=False,
-        query_filter=qfilter
     )
-    return res
 
-def upsert_point(point_id, embedding, payload):
-    client.upsert(
-        collection_name=COLLECTION,
-        points=[models.PointStruct(id=point_id, vector=embedding, payload=payload)]
-    )
+def _group_hits(result):
+    # best hit of each group, groups already ordered by that hit's score
+    return [g.hits[0] for g in result.groups]
+
+def _point_structs(points):
+    from qdrant_client.http import models
+    return [models.PointStruct(id=pid, vector=list(vec), payload=payload) for pid, vec, payload in points]
+
+
+class QdrantStore(VectorStore):
+    """VectorStore on the shared Qdrant client (one collection)."""
+
+    def __init__(self, collection=COLLECTION):
+        self.collection = collection
+
+    def search(self, vector, top_k=5, filter_payload=None):
+        return get_client().search(
+            collection_name=self.collection,
+            query_vector=vector,
+            limit=top_k,
+            with_payload=True,
+            with_vectors=False,
+            query_filter=_build_filter(filter_payload),
+            search_params=_search_params(),
+        )
+
+    def search_batch(self, vectors, top_k=5, filter_payload=None):
+        return get_client().search_batch(
+            collection_name=self.collection, requests=_search_requests(vectors, top_k, filter_payload)
+        )
+
+    def search_groups_batch(self, vectors, top_k=5, group_by="person_id", filter_payload=None):
+        client = get_client()
+        return [
+            _group_hits(client.search_groups(collection_name=self.collection, **_groups_args(v, top_k, group_by, filter_payload)))
+            for v in vectors
+        ]
+
+    def upsert(self, points, wait=True):
+        get_client().upsert(collection_name=self.collection, points=_point_structs(points), wait=wait)
+
+    def set_payload(self, payload, filter_payload):
+        get_client().set_payload(collection_name=self.collection, payload=payload, points=_build_filter(filter_payload))
+
+    async def asearch(self, vector, top_k=5, filter_payload=None):
+        return await get_async_client().search(
+            collection_name=self.collection,
+            query_vector=vector,
+            limit=top_k,
+            with_payload=True,
+            with_vectors=False,
+            query_filter=_build_filter(filter_payload),
+            search_params=_search_params(),
+        )
+
+    async def asearch_batch(self, vectors, top_k=5, filter_payload=None):
+        return await get_async_client().search_batch(
+            collection_name=self.collection, requests=_search_requests(vectors, top_k, filter_payload)
+        )
+
+    async def asearch_groups_batch(self, vectors, top_k=5, group_by="person_id", filter_payload=None):
+        # Qdrant has no batched group search; the queries go out concurrently
+        client = get_async_client()
+        results = await asyncio.gather(*[
+            client.search_groups(collection_name=self.collection, **_groups_args(v, top_k, group_by, filter_payload))
+            for v in vectors
+        ])
+        return [_group_hits(r) for r in results]
+
+    async def aupsert(self, points, wait=True):
+        await get_async_client().upsert(collection_name=self.collection, points=_point_structs(points), wait=wait)
+
+    async def aset_payload(self, payload, filter_payload):
+        await get_async_client().set_payload(
+            collection_name=self.collection, payload=payload, points=_build_filter(filter_payload)
+        )
+
+    async def aclose(self):
+        await close_async_client()
+
+    def delete(self, ids):
+        from qdrant_client.http import models
+        get_client().delete(
+            collection_name=self.collection,
+            points_selector=models.PointIdsList(points=[str(i) for i in ids]),
+        )
+
+    def scroll(self, limit=100, offset=None, with_vectors=False):
+        return get_client().scroll(
+            collection_name=self.collection, limit=limit, offset=offset, with_payload=True, with_vectors=with_vectors
+        )
+
+    def count(self, filter_payload=None):
+        return get_client().count(collection_name=self.collection, count_filter=_build_filter(filter_payload)).count
@@ -0,0 +1,65 @@
+# src/backend/app/services/quality.py
+import cv2
+from ..config import QUALITY_PROFILES
+
+FACE_SIZE = 112  # faces are measured at ArcFace resolution so thresholds don't depend on photo size
+
+
+class QualityRejected(ValueError):
+    """
+    The image decoded but isn't good enough to embed. `detail` says why:
+    {"reason": ..., "metric": ..., "value": ..., "threshold": ...}
+    """
+
+    def __init__(self, detail):
+        # detail stays in args so the exception pickles (process backend)
+        super().__init__(detail)
+        self.detail = self.args[0]
+
+    def __str__(self):
+        return self.detail["reason"]
+
+
+def variance_of_laplacian(gray):
+    # same blur measure as scripts/filter_image.py
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+def get_profile(quality):
+    # profile name ("search", "register") -> settings, None when the gate is off
+    if quality is None:
+        return None
+    settings = QUALITY_PROFILES[quality]
+    return settings if settings["enabled"] else None
+
+
+def _reject(reason, metric, value, threshold):
+    return QualityRejected({"reason": reason, "metric": metric, "value": round(float(value), 3), "threshold": threshold})
+
+
+def check_face_quality(face, score, settings, face_px=None):
+    """
+    face: BGR face region; score: detector confidence, or None for
+    pre-cropped uploads; face_px: face size in the original upload when
+    `face` comes from a downscaled decode. Cheapest checks run first.
+    Returns a QualityRejected instance, or None if the face passes.
+    """
+    if score is not None and score < settings["min_det_score"]:
+        return _reject("low_detection_score", "det_score", score, settings["min_det_score"])
+
+    size = face_px if face_px is not None else min(face.shape[:2])
+    if size < settings["min_face_px"]:
+        return _reject("face_too_small", "face_px", size, settings["min_face_px"])
+
+    gray = cv2.cvtColor(cv2.resize(face, (FACE_SIZE, FACE_SIZE), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    brightness = gray.mean()
+    if brightness < settings["min_brightness"]:
+        return _reject("too_dark", "brightness", brightness, settings["min_brightness"])
+    if brightness > settings["max_brightness"]:
+        return _reject("overexposed", "brightness", brightness, settings["max_brightness"])
+
+    sharpness = variance_of_laplacian(gray)
+    if sharpness < settings["min_sharpness"]:
+        return _reject("too_blurry", "sharpness", sharpness, settings["min_sharpness"])
+
+    return None
@@ -1,19 +1,28 @@
 # src/backend/app/services/redis_service.py
-import redis
-import os
+import threading
 from ..config import REDIS_URL, REDIS_TOKEN
 
-# Upstash works with username/password auth
-# redis-py automatically handles this with from_url
-redis_client = redis.from_url(
-    REDIS_URL,
-    password=REDIS_TOKEN,
-    decode_responses=True
-)
+_redis = {"client": None}
+_lock = threading.Lock()
+
+def get_redis():
+    # Upstash works with username/password auth
+    # redis-py automatically handles this with from_url
+    # The client is created on first use so importing the app never connects.
+    if _redis["client"] is None:
+        with _lock:
+            if _redis["client"] is None:
+                import redis
+                _redis["client"] = redis.from_url(
+                    REDIS_URL,
+                    password=REDIS_TOKEN,
+                    decode_responses=True
+                )
+    return _redis["client"]
 
 def ping_redis():
     try:
-        return redis_client.ping()
+        return get_redis().ping()
     except Exception as e:
         print("Redis connection failed:", e)
         return False
@@ -0,0 +1,205 @@
+# src/backend/app/services/stages.py
+import time
+import queue
+import threading
+import collections
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class Stage:
+    """
+    One step of a StagedPipeline. `fn` takes a list of items and returns a
+    list of results in the same order (like MicroBatcher's fn); each worker
+    hands it up to `batch_size` items that are already waiting.
+
+    A result that is None or an Exception instance ends that item's run: it
+    becomes the item's final result and later stages never see it.
+    """
+
+    def __init__(self, name, fn, workers=1, batch_size=1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+
+class _Job:
+    __slots__ = ("value", "future")
+
+    def __init__(self, value):
+        self.value = value
+        self.future = Future()
+
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages, each with its own worker threads
+    and a bounded queue in front of it, so different items can be in
+    different stages at the same time (decode of one image overlaps SCRFD on
+    another and ArcFace on a third). A full queue blocks the stage feeding
+    it, which bounds memory when the input is faster than the slowest stage.
+
+    ONNX Runtime and OpenCV release the GIL, so threads are enough to keep
+    several cores busy.
+    """
+
+    def __init__(self, stages, queue_size=32):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in self.stages]
+        self._threads = []
+        self._alive = [0] * len(self.stages)
+        self._lock = threading.Lock()
+        self._stats = [{"items": 0, "batches": 0, "busy_s": 0.0} for _ in self.stages]
+        self._started_at = None
+
+    # ------------------------------------------------------------ lifecycle
+
+    def start(self):
+        if self._started_at is not None:
+            return self
+        self._started_at = time.perf_counter()
+        for k, stage in enumerate(self.stages):
+            self._alive[k] = stage.workers
+            for w in range(stage.workers):
+                t = threading.Thread(target=self._work, args=(k,), name=f"stage-{stage.name}-{w}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def close(self):
+        """
+        Finish everything already submitted, then stop the workers. Stop
+        markers follow the work through the stages so nothing is dropped.
+        """
+        if self._started_at is None:
+            return
+        for _ in range(self.stages[0].workers):
+            self._queues[0].put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self._started_at = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------ submitting
+
+    def submit(self, item):
+        """
+        Queue one item; returns a concurrent.futures.Future with its final
+        result. Blocks while the first stage's queue is full.
+        """
+        job = _Job(item)
+        self._queues[0].put(job)
+        return job.future
+
+    def map(self, items):
+        """
+        Feed `items` through the pipeline and yield their results in input
+        order. Failures are yielded as Exception instances so one bad item
+        doesn't end a bulk job.
+        """
+        pending = collections.deque()
+        for item in items:
+            pending.append(self.submit(item))
+            while pending and pending[0].done():
+                yield self._result(pending.popleft())
+        while pending:
+            yield self._result(pending.popleft())
+
+    @staticmethod
+    def _result(future):
+        try:
+            return future.result()
+        except Exception as e:
+            return e
+
+    # ------------------------------------------------------------ workers
+
+    def _take_batch(self, q, batch_size):
+        # block for one item, then take whatever else is already waiting
+        first = q.get()
+        if first is _STOP:
+            return [], True
+        jobs = [first]
+        while len(jobs) < batch_size:
+            try:
+                job = q.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                return jobs, True
+            jobs.append(job)
+        return jobs, False
+
+    def _work(self, k):
+        stage = self.stages[k]
+        q = self._queues[k]
+        last = k == len(self.stages) - 1
+
+        while True:
+            jobs, stop = self._take_batch(q, stage.batch_size)
+            if jobs:
+                self._run(k, stage, jobs, last)
+            if stop:
+                break
+
+        with self._lock:
+            self._alive[k] -= 1
+            done = self._alive[k] == 0
+        if done and not last:
+            # the last worker out passes the stop on to the next stage
+            for _ in range(self.stages[k + 1].workers):
+                self._queues[k + 1].put(_STOP)
+
+    def _run(self, k, stage, jobs, last):
+        t0 = time.perf_counter()
+        try:
+            results = stage.fn([job.value for job in jobs])
+        except Exception as e:
+            results = [e] * len(jobs)
+        elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            stats = self._stats[k]
+            stats["items"] += len(jobs)
+            stats["batches"] += 1
+            stats["busy_s"] += elapsed
+
+        for job, result in zip(jobs, results):
+            if last or result is None or isinstance(result, Exception):
+                job.future.set_result(result)
+            else:
+                job.value = result
+                self._queues[k + 1].put(job)
+
+    # ------------------------------------------------------------ stats
+
+    def stats(self):
+        """
+        Per-stage queue depth, items processed, throughput (items/s since
+        start) and utilization (busy time / wall time across its workers).
+        """
+        wall = time.perf_counter() - self._started_at if self._started_at else 0.0
+        out = {"running": self._started_at is not None, "uptime_s": round(wall, 3), "stages": []}
+        with self._lock:
+            for stage, q, stats in zip(self.stages, self._queues, self._stats):
+                out["stages"].append({
+                    "name": stage.name,
+                    "workers": stage.workers,
+                    "batch_size": stage.batch_size,
+                    "queue_depth": q.qsize(),
+                    "queue_size": self.queue_size,
+                    "items": stats["items"],
+                    "batches": stats["batches"],
+                    "items_per_s": round(stats["items"] / wall, 2) if wall else 0.0,
+                    "utilization": round(stats["busy_s"] / (wall * stage.workers), 3) if wall else 0.0,
+                })
+        return out
@@ -0,0 +1,213 @@
+# src/backend/app/services/vector_store.py
+import threading
+from .executor import run_io
+from ..config import GROUP_OVERFETCH, VECTOR_STORE, LOCAL_STORE_PATH, LOCAL_STORE_INDEX, LOCAL_STORE_NLIST, LOCAL_STORE_NPROBE
+
+
+class Hit:
+    """A stored point, as returned by search and scroll (same fields as Qdrant's)."""
+
+    __slots__ = ("id", "score", "payload", "vector")
+
+    def __init__(self, id, score=None, payload=None, vector=None):
+        self.id = id
+        self.score = score
+        self.payload = payload
+        self.vector = vector
+
+    def __repr__(self):
+        return f"Hit(id={self.id!r}, score={self.score!r}, payload={self.payload!r})"
+
+
+def _best_per_group(hits, group_by, top_k):
+    # hits come best first, so the first hit seen for a group is its best
+    best = {}
+    for h in hits:
+        key = (h.payload or {}).get(group_by, h.id)
+        if key not in best:
+            best[key] = h
+            if len(best) == top_k:
+                break
+    return list(best.values())
+
+
+class VectorStore:
+    """
+    What the app needs from a face gallery. Points are (id, vector, payload)
+    tuples; filter_payload is {field: condition}, all of which must match.
+    A condition is a value (equal), a list (any of), {"gte"/"gt"/"lte"/"lt":
+    bound} (numbers, or ISO dates as strings) or {"text": "..."} (every word
+    appears in the field, case-insensitive).
+    Search hits expose .id, .score (cosine similarity) and .payload.
+    Grouped search returns the best hit of each of the top_k distinct values
+    of payload[group_by] (e.g. top people rather than top photos).
+    The a* methods are for async handlers; by default they run the blocking
+    call on a thread, backends with an async client override them.
+    """
+
+    def search(self, vector, top_k=5, filter_payload=None):
+        return self.search_batch([vector], top_k, filter_payload)[0]
+
+    def search_batch(self, vectors, top_k=5, filter_payload=None):
+        raise NotImplementedError
+
+    def search_groups_batch(self, vectors, top_k=5, group_by="person_id", filter_payload=None):
+        return [self._search_groups(v, top_k, group_by, filter_payload) for v in vectors]
+
+    def _search_groups(self, vector, top_k, group_by, filter_payload):
+        # over-fetch and dedupe, widening until top_k groups or the gallery runs out
+        fetch = top_k * GROUP_OVERFETCH
+        while True:
+            hits = self.search(vector, fetch, filter_payload)
+            best = _best_per_group(hits, group_by, top_k)
+            if len(best) == top_k or len(hits) < fetch:
+                return best
+            fetch *= GROUP_OVERFETCH
+
+    def upsert(self, points, wait=True):
+        # wait=False: return once the write is accepted, before it is indexed
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def set_payload(self, payload, filter_payload):
+        # merge `payload` into the payload of every point matching the filter
+        raise NotImplementedError
+
+    def scroll(self, limit=100, offset=None, with_vectors=False):
+        # (points, next offset or None)
+        raise NotImplementedError
+
+    def count(self, filter_payload=None):
+        raise NotImplementedError
+
+    async def asearch(self, vector, top_k=5, filter_payload=None):
+        return (await self.asearch_batch([vector], top_k, filter_payload))[0]
+
+    async def asearch_batch(self, vectors, top_k=5, filter_payload=None):
+        return await run_io(self.search_batch, vectors, top_k, filter_payload)
+
+    async def asearch_groups_batch(self, vectors, top_k=5, group_by="person_id", filter_payload=None):
+        return await run_io(self.search_groups_batch, vectors, top_k, group_by, filter_payload)
+
+    async def aupsert(self, points, wait=True):
+        await run_io(self.upsert, points, wait)
+
+    async def aset_payload(self, payload, filter_payload):
+        await run_io(self.set_payload, payload, filter_payload)
+
+    async def aclose(self):
+        pass
+
+
+_store = {"store": None}
+_lock = threading.Lock()
+
+
+def get_vector_store():
+    """
+    The configured gallery backend (VECTOR_STORE): "qdrant" (default) or
+    "local" (in-process, memory-mapped NumPy index at LOCAL_STORE_PATH).
+    """
+    if _store["store"] is None:
+        with _lock:
+            if _store["store"] is None:
+                if VECTOR_STORE == "local":
+                    from .local_store import LocalStore
+                    _store["store"] = LocalStore(
+                        LOCAL_STORE_PATH, index=LOCAL_STORE_INDEX, nlist=LOCAL_STORE_NLIST, nprobe=LOCAL_STORE_NPROBE
+                    )
+                else:
+                    from .qdrant_service import QdrantStore
+                    _store["store"] = QdrantStore()
+    return _store["store"]
+
+
+def _iso_date(value):
+    # Date columns hold a date once loaded, but may still be the raw string on a new object
+    if value is None or isinstance(value, str):
+        return value or None
+    return value.isoformat()
+
+
+def person_payload(person):
+    """
+    Payload stored with a person's face. The filterable fields are indexed
+    in Qdrant by pipelines/create_qdrant_indexes.py; the display fields let
+    /search build its results without a Redis or Postgres lookup, so they
+    must be re-synced (sync_person_payload) whenever the Person changes.
+    """
+    return {
+        "person_id": str(person.id),
+        "verified": bool(person.verified),
+        "image_url": person.image_url,
+        "name": person.name,
+        "case_id": person.case_id,
+        "case_status": person.case_status,
+        "gender": person.gender,
+        "age": person.age,
+        "last_seen_location": person.last_seen_location,
+        "last_seen_date": _iso_date(person.last_seen_date),
+    }
+
+
+def person_image_payload(person, image):
+    # an extra photo's point: the person's fields plus which photo it is
+    return {**person_payload(person), "image_id": str(image.id), "face_url": image.image_url}
+
+
+def search_vectors(embedding, top_k=5, filter_payload=None, group_by=None):
+    """
+    embedding: list[float]
+    filter_payload: dict (e.g., {"verified": True, "age": {"gte": 10, "lte": 20}})
+    group_by: payload field (e.g. "person_id") to return one hit per value
+    returns list of hits with id, score and payload
+    """
+    return search_vectors_batch([embedding], top_k, filter_payload, group_by)[0]
+
+
+def search_vectors_batch(embeddings, top_k=5, filter_payload=None, group_by=None):
+    # several query embeddings in one call; one hit list per embedding, in input order
+    if not embeddings:
+        return []
+    if group_by:
+        return get_vector_store().search_groups_batch(embeddings, top_k, group_by, filter_payload)
+    return get_vector_store().search_batch(embeddings, top_k, filter_payload)
+
+
+def upsert_point(point_id, embedding, payload):
+    # single writes wait for indexing so the face is searchable on return;
+    # bulk loads go through bulk_writer.BulkWriter
+    from .bulk_writer import upsert_with_retry
+    upsert_with_retry(get_vector_store(), [(point_id, embedding, payload)])
+
+
+async def search_vectors_async(embedding, top_k=5, filter_payload=None, group_by=None):
+    if group_by:
+        return (await get_vector_store().asearch_groups_batch([embedding], top_k, group_by, filter_payload))[0]
+    return await get_vector_store().asearch(embedding, top_k, filter_payload)
+
+
+async def search_vectors_batch_async(embeddings, top_k=5, filter_payload=None, group_by=None):
+    if not embeddings:
+        return []
+    if group_by:
+        return await get_vector_store().asearch_groups_batch(embeddings, top_k, group_by, filter_payload)
+    return await get_vector_store().asearch_batch(embeddings, top_k, filter_payload)
+
+
+async def upsert_point_async(point_id, embedding, payload):
+    await upsert_points_async([(point_id, embedding, payload)])
+
+
+async def upsert_points_async(points):
+    # a handful of points from a request handler: one request, retried, waited on
+    from .bulk_writer import aupsert_with_retry
+    await aupsert_with_retry(get_vector_store(), points)
+
+
+async def sync_person_payload(person):
+    # rewrite the denormalized fields on every point of this person (each
+    # photo's image_id / face_url are not part of person_payload, so they stay)
+    await get_vector_store().aset_payload(person_payload(person), {"person_id": str(person.id)})
@@ -0,0 +1,319 @@
+# src/backend/app/services/video.py
+#
+# Search CCTV clips: sample frames adaptively, detect faces in batches,
+# follow each face across frames with an IoU tracker, and embed/search each
+# track only a few times instead of every frame.
+import time
+import cv2
+import numpy as np
+from .nms import iou_matrix
+from .vector_store import search_vectors_batch
+from ..pipeline import detect_frames, face_chip, embed_faces
+from ..config import (
+    TOP_K, VIDEO_SAMPLE_FPS, VIDEO_MIN_SAMPLE_FPS, VIDEO_MAX_SAMPLE_FPS,
+    VIDEO_MOTION_THRESHOLD, VIDEO_MJPEG_FPS, VIDEO_DETECT_BATCH, VIDEO_MIN_SCORE,
+    VIDEO_TRACK_IOU, VIDEO_TRACK_MAX_AGE, VIDEO_EMBEDS_PER_TRACK, VIDEO_MAX_SECONDS,
+)
+
+MOTION_SIZE = (64, 36)  # thumbnail used to measure scene change
+
+
+class FrameSampler:
+    """
+    Decides which frames get looked at. Faster while faces are tracked,
+    slower when the scene is static and empty.
+    """
+
+    def __init__(self):
+        self.next_due = 0.0
+        self.tracking = False
+        self._prev = None
+
+    def accept(self, t, frame):
+        small = cv2.cvtColor(cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        motion = float(np.abs(small.astype(np.int16) - self._prev).mean()) if self._prev is not None else VIDEO_MOTION_THRESHOLD
+        self._prev = small
+
+        if self.tracking:
+            rate = VIDEO_MAX_SAMPLE_FPS
+        elif motion >= VIDEO_MOTION_THRESHOLD:
+            rate = VIDEO_SAMPLE_FPS
+        else:
+            rate = VIDEO_MIN_SAMPLE_FPS
+        self.next_due = t + 1.0 / rate
+
+
+def video_frames(path, sampler):
+    # (seconds, frame) for sampled frames; skipped frames are grabbed but never converted
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("Unreadable video")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    index = 0
+    try:
+        while cap.grab():
+            t = index / fps
+            index += 1
+            if t > VIDEO_MAX_SECONDS:
+                break
+            if t < sampler.next_due:
+                continue
+            ok, frame = cap.retrieve()
+            if ok:
+                sampler.accept(t, frame)
+                yield t, frame
+    finally:
+        cap.release()
+
+
+def _jpeg_end(data, start):
+    """
+    Index just past the EOI of the JPEG starting at `start`. Walks the marker
+    segments by their lengths (like image_io.jpeg_size), so an EOI inside a
+    segment, such as an EXIF thumbnail's, isn't taken for the frame's own.
+    None if the frame is cut short or the markers don't parse.
+    """
+    i, n = start + 2, len(data)
+    while i + 2 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0xD9:
+            return i + 2
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # markers without a length
+            i += 2
+            continue
+        if i + 4 > n:
+            return None
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+        if marker == 0xDA:
+            # entropy-coded data runs to the next marker that isn't a stuffed
+            # 0xFF00, a restart marker or fill
+            while True:
+                i = data.find(b"\xff", i)
+                if i == -1 or i + 1 >= n:
+                    return None
+                nxt = data[i + 1]
+                if nxt == 0x00 or 0xD0 <= nxt <= 0xD7:
+                    i += 2
+                elif nxt == 0xFF:
+                    i += 1
+                else:
+                    break
+    return None
+
+
+def split_jpeg_stream(data):
+    # concatenated JPEGs (MJPEG) -> list of per-frame byte slices
+    frames, start = [], data.find(b"\xff\xd8")
+    while start != -1:
+        end = _jpeg_end(data, start)
+        if end is None:  # truncated or corrupt: nothing after it can be trusted
+            break
+        frames.append(data[start:end])
+        start = data.find(b"\xff\xd8", end)
+    return frames
+
+
+def jpeg_frames(blobs, sampler):
+    # (seconds, frame) for a JPEG frame stream; frames that aren't due are never decoded
+    for index, blob in enumerate(blobs):
+        t = index / VIDEO_MJPEG_FPS
+        if t > VIDEO_MAX_SECONDS:
+            break
+        if t < sampler.next_due:
+            continue
+        frame = cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR)
+        if frame is not None:
+            sampler.accept(t, frame)
+            yield t, frame
+
+
+class Track:
+    def __init__(self, track_id, t, det):
+        self.id = track_id
+        self.first_seen = t
+        self.last_seen = t
+        self.box = det["box"]
+        self.missed = 0
+        self.embeds = 0
+        self.best_quality = 0.0
+        self.hits = {}  # person id -> best hit
+
+    def summary(self):
+        return {
+            "track_id": self.id,
+            "first_seen": round(self.first_seen, 2),
+            "last_seen": round(self.last_seen, 2),
+            "box": [int(v) for v in self.box],
+            "embeddings": self.embeds,
+        }
+
+
+def _face_quality(det):
+    # prefer confident, large detections when picking frames to embed
+    return det["score"] * min(det["box"][2], det["box"][3])
+
+
+class FaceTracker:
+    """Greedy IoU association of detections to tracks across sampled frames."""
+
+    def __init__(self, iou_thresh=VIDEO_TRACK_IOU, max_age=VIDEO_TRACK_MAX_AGE):
+        self.iou_thresh = iou_thresh
+        self.max_age = max_age
+        self.active = []
+        self.created = 0
+
+    def update(self, t, dets):
+        """
+        Returns (matched [(track, det)], ended tracks) for one frame.
+        New detections start tracks and are included in matched.
+        """
+        matched, used = [], set()
+        if self.active and dets:
+            track_boxes = np.array([tr.box for tr in self.active], dtype=np.float32)
+            det_boxes = np.array([d["box"] for d in dets], dtype=np.float32)
+            # x, y, w, h -> x1, y1, x2, y2
+            track_boxes[:, 2:] += track_boxes[:, :2]
+            det_boxes[:, 2:] += det_boxes[:, :2]
+            ious = iou_matrix(track_boxes, det_boxes)
+
+            pairs = [(ious[i, j], i, j) for i, j in zip(*np.nonzero(ious >= self.iou_thresh))]
+
+            assigned = set()
+            for _, i, j in sorted(pairs, reverse=True):
+                if i in assigned or j in used:
+                    continue
+                assigned.add(i)
+                used.add(j)
+                matched.append((self.active[i], dets[j]))
+
+        for track, det in matched:
+            track.box, track.last_seen, track.missed = det["box"], t, 0
+
+        for j, det in enumerate(dets):
+            if j not in used:
+                self.created += 1
+                track = Track(self.created, t, det)
+                self.active.append(track)
+                matched.append((track, det))
+
+        seen = {id(track) for track, _ in matched}
+        ended = []
+        for track in self.active:
+            if id(track) not in seen:
+                track.missed += 1
+                if track.missed > self.max_age:
+                    ended.append(track)
+        self.active = [tr for tr in self.active if tr not in ended]
+        return matched, ended
+
+    def flush(self):
+        ended, self.active = self.active, []
+        return ended
+
+
+def _hit_person(hit):
+    payload = hit.payload or {}
+    return payload.get("person_id") or payload.get("id") or payload.get("personId")
+
+
+class VideoSearch:
+    """
+    Step-wise search over a frame source. Each step() handles one batch of
+    sampled frames and returns events:
+      {"type": "match", "track": Track, "hits": [...]}  track's best hits improved
+      {"type": "track_end", "track": Track}
+      {"type": "progress", ...}
+    and None once the footage is exhausted (after a final "done" step).
+    """
+
+    def __init__(self, frames, sampler, top_k=TOP_K, filter_payload=None):
+        self.frames = frames
+        self.sampler = sampler
+        self.top_k = top_k
+        self.filter_payload = filter_payload
+        self.tracker = FaceTracker()
+        self.started = time.perf_counter()
+        self.footage_s = 0.0
+        self.sampled = 0
+        self.finished = False
+
+    def _next_batch(self):
+        batch = []
+        for t, frame in self.frames:
+            batch.append((t, frame))
+            if len(batch) >= VIDEO_DETECT_BATCH:
+                break
+        return batch
+
+    def step(self):
+        if self.finished:
+            return None
+
+        batch = self._next_batch()
+        if not batch:
+            self.finished = True
+            events = [{"type": "track_end", "track": tr} for tr in self.tracker.flush()]
+            elapsed = time.perf_counter() - self.started
+            events.append({
+                "type": "done",
+                "footage_s": round(self.footage_s, 2),
+                "elapsed_s": round(elapsed, 2),
+                "frames_sampled": self.sampled,
+                "tracks": self.tracker.created,
+                "realtime_factor": round(self.footage_s / elapsed, 2) if elapsed else None,
+            })
+            return events
+
+        # one SCRFD call for the whole batch of sampled frames
+        all_dets = detect_frames([frame for _, frame in batch], VIDEO_MIN_SCORE)
+
+        events, to_embed = [], []
+        for (t, frame), dets in zip(batch, all_dets):
+            matched, ended = self.tracker.update(t, dets)
+            events.extend({"type": "track_end", "track": tr} for tr in ended)
+
+            # embed a track again only when a clearly better view comes along
+            for track, det in matched:
+                quality = _face_quality(det)
+                if track.embeds < VIDEO_EMBEDS_PER_TRACK and quality > track.best_quality * 1.2:
+                    track.embeds += 1
+                    track.best_quality = quality
+                    chip = face_chip(frame, det)
+                    if chip is not None:
+                        to_embed.append((track, chip))
+
+        self.sampler.tracking = bool(self.tracker.active)
+        self.sampled += len(batch)
+        self.footage_s = batch[-1][0]
+
+        if to_embed:
+            # one ArcFace call and one batched vector search for every new face view
+            embeddings = embed_faces([chip for _, chip in to_embed])
+            hit_lists = search_vectors_batch(
+                [e.tolist() for e in embeddings], top_k=self.top_k, filter_payload=self.filter_payload, group_by="person_id"
+            )
+            for (track, _), hits in zip(to_embed, hit_lists):
+                improved = False
+                for hit in hits:
+                    pid = _hit_person(hit)
+                    if pid and (pid not in track.hits or hit.score > track.hits[pid].score):
+                        track.hits[pid] = hit
+                        improved = True
+                if improved:
+                    best = sorted(track.hits.values(), key=lambda h: h.score, reverse=True)[:self.top_k]
+                    events.append({"type": "match", "track": track, "hits": best})
+
+        elapsed = time.perf_counter() - self.started
+        events.append({
+            "type": "progress",
+            "footage_s": round(self.footage_s, 2),
+            "frames_sampled": self.sampled,
+            "active_tracks": len(self.tracker.active),
+            "realtime_factor": round(self.footage_s / elapsed, 2) if elapsed else None,
+        })
+        return events
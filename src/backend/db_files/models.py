@@ -35,6 +35,15 @@ class Person(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     qdrant_id = Column(String(255))
+
+class PersonImage(Base):
+    # extra photos of a person; each one is its own vector point (id = this id)
+    __tablename__ = "person_images"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    person_id = Column(UUID(as_uuid=True), ForeignKey("persons.id", ondelete="CASCADE"), nullable=False, index=True)
+    image_url = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
     
 class Registration(Base):
     __tablename__ = "registrations"
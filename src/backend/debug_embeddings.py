@@ -3,30 +3,20 @@ import os, json, math
 from dotenv import load_dotenv
 load_dotenv()
 
-from qdrant_client import QdrantClient
-from .app.services.qdrant_service import COLLECTION
+from .app.services.vector_store import get_vector_store
 from .app.pipeline import extract_embedding
 import requests
 import numpy as np
 
-QDRANT_URL = os.getenv("QDRANT_URL")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
-
-client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+store = get_vector_store()
 
 def print_collection_info():
-    info = client.get_collection(COLLECTION)
-    print("Collection info keys:", list(info.__dict__.keys()) if info else info)
-    try:
-        cfg = info.result.config
-        print("Vectors config:", cfg.vectors)
-        print("Distance/metric may be in collection config (check vector params above).")
-    except Exception as e:
-        print("Could not print config:", e)
+    print("Vector store:", type(store).__name__)
+    print("Points:", store.count())
 
 def get_one_point():
-    # scroll returns (points, next_page_offset) in your version
-    points, offset = client.scroll(collection_name=COLLECTION, limit=1)
+    # scroll returns (points, next_page_offset)
+    points, offset = store.scroll(limit=1, with_vectors=True)
 
     if not points or len(points) == 0:
         print("No points in collection.")
@@ -35,12 +25,7 @@ def get_one_point():
     p = points[0]
     print("Point id:", p.id)
 
-    # Try to fetch full point with vector
-    try:
-        full = client.get_point(collection_name=COLLECTION, id=p.id, with_vector=True)
-        vect = full.vector  # no .result in current API
-    except Exception:
-        vect = getattr(p, "vector", None) or p.payload.get("vector")
+    vect = getattr(p, "vector", None) or p.payload.get("vector")
     
     if vect is None:
         print("No vector found for point", p.id)
@@ -1,24 +1,35 @@
-from qdrant_client import QdrantClient
+# Payload indexes for the fields /search filters on (see person_payload in
+# app/services/vector_store.py). Safe to re-run: existing indexes are kept.
+#   python -m src.backend.pipelines.create_qdrant_indexes
 from qdrant_client.http import models
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
-client = QdrantClient(
-    url=os.getenv("QDRANT_URL"),
-    api_key=os.getenv("QDRANT_API_KEY"),
-    prefer_grpc=False
-)
+from src.backend.app.services.qdrant_service import get_client, COLLECTION
 
-COLLECTION = "faces_collection"
+client = get_client()
 
-print("➡ Creating index for payload field: verified (bool) ...")
+INDEXES = {
+    "person_id": models.PayloadSchemaType.KEYWORD,  # group-by key, and payload sync filter
+    "verified": models.PayloadSchemaType.BOOL,
+    "case_status": models.PayloadSchemaType.KEYWORD,
+    "gender": models.PayloadSchemaType.KEYWORD,
+    "age": models.PayloadSchemaType.INTEGER,
+    "last_seen_date": models.PayloadSchemaType.DATETIME,
+    # full-text: "Hyderabad" matches "Old City, Hyderabad"
+    "last_seen_location": models.TextIndexParams(
+        type=models.TextIndexType.TEXT, tokenizer=models.TokenizerType.WORD, lowercase=True
+    ),
+}
 
-client.create_payload_index(
-    collection_name=COLLECTION,
-    field_name="verified",
-    field_type="bool"
-)
+existing = client.get_collection(COLLECTION).payload_schema
 
-print("✓ Index created successfully!")
+for field, schema in INDEXES.items():
+    if field in existing:
+        print(f"✓ Index on {field} already exists")
+        continue
+    print(f"➡ Creating index for payload field: {field} ...")
+    client.create_payload_index(collection_name=COLLECTION, field_name=field, field_schema=schema)
+
+print("✓ Indexes created successfully!")
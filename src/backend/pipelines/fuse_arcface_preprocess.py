@@ -0,0 +1,62 @@
+# Fold ArcFace preprocessing into the ONNX graph.
+#
+# The fused model takes raw uint8 BGR faces as (N, 112, 112, 3) and does
+# the cast, HWC -> CHW transpose, BGR -> RGB swap and (x - 127.5) / 128
+# inside the graph. The embedder detects the uint8 input and warps faces
+# straight into the batch without any float conversion on the Python side.
+#
+# Usage (from the project root):
+#   python -m src.backend.pipelines.fuse_arcface_preprocess \
+#       src/backend/models/glintr100.onnx src/backend/models/glintr100_uint8.onnx
+# then point ARCFACE_ONNX at the output.
+import sys
+import numpy as np
+import onnx
+from onnx import helper, numpy_helper, TensorProto
+
+FUSED_INPUT = "face_bgr_uint8"
+
+
+def fuse(src_path, dst_path):
+    model = onnx.load(src_path)
+    graph = model.graph
+
+    # the original float input (N, 3, 112, 112)
+    initializer_names = {init.name for init in graph.initializer}
+    old_input = next(i for i in graph.input if i.name not in initializer_names)
+    batch_dim = old_input.type.tensor_type.shape.dim[0]
+    batch = batch_dim.dim_value if batch_dim.HasField("dim_value") else (batch_dim.dim_param or "N")
+
+    new_input = helper.make_tensor_value_info(FUSED_INPUT, TensorProto.UINT8, [batch, 112, 112, 3])
+
+    graph.initializer.extend([
+        numpy_helper.from_array(np.array([2, 1, 0], dtype=np.int64), "pre_bgr2rgb"),
+        numpy_helper.from_array(np.array(127.5, dtype=np.float32), "pre_mean"),
+        numpy_helper.from_array(np.array(1.0 / 128.0, dtype=np.float32), "pre_scale"),
+    ])
+    pre_nodes = [
+        helper.make_node("Cast", [FUSED_INPUT], ["pre_float"], to=TensorProto.FLOAT),
+        helper.make_node("Transpose", ["pre_float"], ["pre_nchw"], perm=[0, 3, 1, 2]),
+        helper.make_node("Gather", ["pre_nchw", "pre_bgr2rgb"], ["pre_rgb"], axis=1),
+        helper.make_node("Sub", ["pre_rgb", "pre_mean"], ["pre_centered"]),
+        helper.make_node("Mul", ["pre_centered", "pre_scale"], [old_input.name]),
+    ]
+
+    nodes = pre_nodes + list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes)
+
+    inputs = [new_input] + [i for i in graph.input if i.name != old_input.name]
+    del graph.input[:]
+    graph.input.extend(inputs)
+
+    onnx.checker.check_model(model)
+    onnx.save(model, dst_path)
+    print(f"✓ Saved fused model to {dst_path} (input: {FUSED_INPUT} uint8 [{batch}, 112, 112, 3])")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m src.backend.pipelines.fuse_arcface_preprocess <src.onnx> <dst.onnx>")
+        raise SystemExit(1)
+    fuse(sys.argv[1], sys.argv[2])
@@ -1,27 +1,17 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
-import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = QdrantClient(
-    url=os.getenv("QDRANT_URL"),
-    api_key=os.getenv("QDRANT_API_KEY")
-)
+from src.backend.app.services.vector_store import get_vector_store, upsert_point
+from src.backend.app.services.bulk_writer import BulkWriter
 
 def insert_embedding(person_id, embedding, payload):
-    client.upsert(
-        collection_name="faces_collection",
-        points=[
-            models.PointStruct(
-                id=person_id,
-                vector=embedding,
-                payload=payload
-            )
-        ]
-    )
+    # one point, retried; for many points use bulk_writer() instead
+    upsert_point(person_id, embedding, payload)
+
+def bulk_writer(**kwargs):
+    # batched, parallel upserts: `with bulk_writer() as w: w.add(id, emb, payload)`
+    return BulkWriter(**kwargs)
 
 def count_points():
-    info = client.count("faces_collection")
-    return info.count
+    return get_vector_store().count()
@@ -4,7 +4,7 @@ import asyncio
 from src.backend.pipelines.upload_cloudinary import upload_image
 from src.backend.pipelines.compute_embeddings import compute_embedding
 from src.backend.pipelines.insert_postgres import insert_metadata
-from src.backend.pipelines.insert_qdrant import insert_embedding
+from src.backend.pipelines.insert_qdrant import bulk_writer
 
 IMAGE_DIR = "data/processed"
 METADATA_FILE = "data/metadata/persons_metadata.json"
@@ -27,22 +27,33 @@ async def load_dataset():
     with open(METADATA_FILE, "r") as f:
         data = json.load(f)
 
-    for person in data:
-        pid = person["id"]
-        img_path = os.path.join(IMAGE_DIR, person["image_filename"])
-
-        emb = compute_embedding(img_path)
-        if emb is None:
-            print(f"No embedding for {img_path}")
-            continue
-
-        payload = {
-            "id": pid,
-            "verified": True,
-            "image_url": cloudinary_map[person["image_filename"]],
-        }
-
-        insert_embedding(pid, emb, payload)
+    with bulk_writer() as writer:
+        for person in data:
+            pid = person["id"]
+            img_path = os.path.join(IMAGE_DIR, person["image_filename"])
+
+            emb = compute_embedding(img_path)
+            if emb is None:
+                print(f"No embedding for {img_path}")
+                continue
+
+            payload = {
+                "id": pid,
+                "person_id": pid,
+                "verified": True,
+                "image_url": cloudinary_map[person["image_filename"]],
+                "name": person["name"],
+                "case_id": person["case_id"],
+                "case_status": person["case_status"],
+                "gender": person["gender"],
+                "age": person["age"],
+                "last_seen_location": person["last_seen_location"],
+                "last_seen_date": person["last_seen_date"],
+            }
+
+            writer.add(pid, emb, payload)
+
+    print("⬆ Upserts:", writer.stats())
 
     print("\n🎉 DONE — Dataset fully loaded into Cloudinary, Postgres & Qdrant!\n")
 
@@ -1,23 +1,39 @@
 ## Run only once
+#
+# Creates faces_collection from the QDRANT_* layout settings in app/config.py
+# (quantization, HNSW m/ef_construct, on-disk originals).
+#   python -m src.backend.pipelines.make_qdrant_collection           # drop and recreate
+#   python -m src.backend.pipelines.make_qdrant_collection --update  # apply to the existing collection
 
-from qdrant_client import QdrantClient
+import sys
 from qdrant_client.http import models
-import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = QdrantClient(
-    url=os.getenv("QDRANT_URL"),
-    api_key=os.getenv("QDRANT_API_KEY")
+from src.backend.app.config import QDRANT_QUANTIZATION, QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT, QDRANT_VECTORS_ON_DISK
+from src.backend.app.services.qdrant_service import (
+    get_client, COLLECTION, vectors_config, hnsw_config, quantization_config,
 )
 
-client.recreate_collection(
-    collection_name="faces_collection",
-    vectors_config=models.VectorParams(
-        size=512,
-        distance=models.Distance.COSINE
+client = get_client()
+
+if "--update" in sys.argv:
+    # Qdrant rebuilds the index/quantized vectors in the background; points stay searchable
+    client.update_collection(
+        collection_name=COLLECTION,
+        vectors_config={"": models.VectorParamsDiff(on_disk=QDRANT_VECTORS_ON_DISK)},
+        hnsw_config=hnsw_config(),
+        quantization_config=quantization_config() or models.Disabled.DISABLED,
     )
-)
+    print(f"Updated collection {COLLECTION}.")
+else:
+    client.recreate_collection(
+        collection_name=COLLECTION,
+        vectors_config=vectors_config(),
+        hnsw_config=hnsw_config(),
+        quantization_config=quantization_config(),
+    )
+    print(f"Created collection {COLLECTION} with vector size 512.")
 
-print("Created collection faces_collection with vector size 512.")
+print(f"quantization={QDRANT_QUANTIZATION} m={QDRANT_HNSW_M} ef_construct={QDRANT_HNSW_EF_CONSTRUCT} on_disk={QDRANT_VECTORS_ON_DISK}")
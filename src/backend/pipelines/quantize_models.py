@@ -0,0 +1,168 @@
+# Build INT8 versions of SCRFD and glintr100 and gate them against FP32.
+#
+# Usage (from the project root):
+#   python -m src.backend.pipelines.quantize_models --mode static
+#   python -m src.backend.pipelines.quantize_models --mode dynamic --num-calib 50
+#
+# Writes <model>_int8_<mode>.onnx next to the FP32 models and prints latency,
+# size, embedding cosine agreement and gallery top-k agreement. Exits with
+# status 1 if a gate fails. Serve the result through SCRFD_ONNX / ARCFACE_ONNX.
+import os
+import time
+import argparse
+import cv2
+import numpy as np
+from onnxruntime.quantization import (
+    quantize_dynamic, quantize_static, CalibrationDataReader, QuantFormat, QuantType,
+)
+from src.backend.app.config import BUFFALO_ONNX, SCRFD_ONNX, ARCFACE_ORT_SETTINGS, SCRFD_ORT_SETTINGS
+from src.backend.app.services.ort_session import create_session
+from src.backend.app.services.detector import preprocess as preprocess_detector
+from src.backend.app.services.embedder import preprocess_face_bgr
+
+IMAGE_DIR = "data/processed"
+DETECTOR_SIZE = 640
+
+
+def load_images(image_dir, limit):
+    files = sorted(f for f in os.listdir(image_dir) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+    images = [cv2.imread(os.path.join(image_dir, f)) for f in files[:limit]]
+    return [img for img in images if img is not None]
+
+
+class ListReader(CalibrationDataReader):
+    # feeds a fixed list of preprocessed inputs to the static quantizer
+    def __init__(self, input_name, blobs):
+        self._it = iter({input_name: b} for b in blobs)
+
+    def get_next(self):
+        return next(self._it, None)
+
+
+def quantize(src, dst, mode, input_name, calib_blobs):
+    if mode == "dynamic":
+        quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    else:
+        quantize_static(
+            src, dst, ListReader(input_name, calib_blobs),
+            quant_format=QuantFormat.QDQ, per_channel=True,
+            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+        )
+
+
+def mean_latency_ms(session, feed, runs=20):
+    session.run(None, feed)
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        session.run(None, feed)
+    return (time.perf_counter() - t0) / runs * 1000
+
+
+def size_mb(path):
+    return os.path.getsize(path) / (1024 * 1024)
+
+
+def embed_all(session, blobs):
+    name = session.get_inputs()[0].name
+    emb = np.concatenate([session.run(None, {name: b})[0] for b in blobs]).astype(np.float32)
+    return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+
+def topk_sets(queries, gallery, k):
+    sims = queries @ gallery.T
+    np.fill_diagonal(sims, -np.inf)  # queries are the gallery itself; ignore self-matches
+    return [set(row) for row in np.argsort(-sims, axis=1)[:, :k]]
+
+
+def check_arcface(args, images):
+    blobs = [preprocess_face_bgr(img) for img in images]
+    dst = BUFFALO_ONNX.replace(".onnx", f"_int8_{args.mode}.onnx")
+
+    fp32 = create_session("arcface_fp32", BUFFALO_ONNX, ARCFACE_ORT_SETTINGS)
+    print(f"➡ Quantizing {BUFFALO_ONNX} ({args.mode}) ...")
+    quantize(BUFFALO_ONNX, dst, args.mode, fp32.get_inputs()[0].name, blobs[:args.num_calib])
+    int8 = create_session("arcface_int8", dst, ARCFACE_ORT_SETTINGS)
+
+    e32, e8 = embed_all(fp32, blobs), embed_all(int8, blobs)
+    cos = (e32 * e8).sum(axis=1)
+
+    k = min(args.top_k, len(images) - 1)
+    ref = topk_sets(e32, e32, k)
+    same_space = np.mean([len(a & b) / k for a, b in zip(ref, topk_sets(e8, e8, k))])
+    # INT8 queries against an FP32-built gallery (serving before a rebuild)
+    mixed = np.mean([len(a & b) / k for a, b in zip(ref, topk_sets(e8, e32, k))])
+
+    feed = {fp32.get_inputs()[0].name: blobs[0]}
+    lat32, lat8 = mean_latency_ms(fp32, feed), mean_latency_ms(int8, feed)
+
+    print(f"\nArcFace  {os.path.basename(dst)}")
+    print(f"  size      {size_mb(BUFFALO_ONNX):8.1f} MB -> {size_mb(dst):8.1f} MB")
+    print(f"  latency   {lat32:8.2f} ms -> {lat8:8.2f} ms  ({lat32 / lat8:.2f}x)")
+    print(f"  cosine    mean {cos.mean():.4f}  min {cos.min():.4f}")
+    print(f"  top-{k}     int8 gallery {same_space:.3f}  fp32 gallery {mixed:.3f}")
+
+    return {
+        "cosine": cos.mean() >= args.min_cosine,
+        "top-k": min(same_space, mixed) >= args.min_topk,
+        "speedup": lat32 / lat8 >= args.min_speedup,
+    }
+
+
+def check_scrfd(args, images):
+    blobs = [preprocess_detector(img, DETECTOR_SIZE)[0] for img in images]
+    dst = SCRFD_ONNX.replace(".onnx", f"_int8_{args.mode}.onnx")
+
+    fp32 = create_session("scrfd_fp32", SCRFD_ONNX, SCRFD_ORT_SETTINGS)
+    name = fp32.get_inputs()[0].name
+    print(f"➡ Quantizing {SCRFD_ONNX} ({args.mode}) ...")
+    quantize(SCRFD_ONNX, dst, args.mode, name, blobs[:args.num_calib])
+    int8 = create_session("scrfd_int8", dst, SCRFD_ORT_SETTINGS)
+
+    # agreement of the raw score maps (first output per stride)
+    score_err = []
+    for b in blobs:
+        o32, o8 = fp32.run(None, {name: b}), int8.run(None, {name: b})
+        score_err.append(max(np.abs(a - c).max() for a, c in zip(o32[:3], o8[:3])))
+
+    feed = {name: blobs[0]}
+    lat32, lat8 = mean_latency_ms(fp32, feed), mean_latency_ms(int8, feed)
+
+    print(f"\nSCRFD    {os.path.basename(dst)}")
+    print(f"  size      {size_mb(SCRFD_ONNX):8.1f} MB -> {size_mb(dst):8.1f} MB")
+    print(f"  latency   {lat32:8.2f} ms -> {lat8:8.2f} ms  ({lat32 / lat8:.2f}x)")
+    print(f"  score err mean {np.mean(score_err):.4f}  max {np.max(score_err):.4f}")
+
+    return {
+        "score error": np.max(score_err) <= args.max_score_err,
+        "speedup": lat32 / lat8 >= args.min_speedup,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize SCRFD / glintr100 to INT8 and compare with FP32")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--models", choices=["both", "arcface", "scrfd"], default="both")
+    parser.add_argument("--image-dir", default=IMAGE_DIR)
+    parser.add_argument("--num-images", type=int, default=300, help="images used for the gallery checks")
+    parser.add_argument("--num-calib", type=int, default=100, help="images used for static calibration")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--min-topk", type=float, default=0.9)
+    parser.add_argument("--max-score-err", type=float, default=0.1)
+    parser.add_argument("--min-speedup", type=float, default=1.0)
+    args = parser.parse_args()
+
+    images = load_images(args.image_dir, args.num_images)
+    print(f"Loaded {len(images)} images from {args.image_dir}")
+
+    gates = {}
+    if args.models in ("both", "arcface"):
+        gates.update({f"arcface {k}": v for k, v in check_arcface(args, images).items()})
+    if args.models in ("both", "scrfd"):
+        gates.update({f"scrfd {k}": v for k, v in check_scrfd(args, images).items()})
+
+    print("\nGate:")
+    for name, ok in gates.items():
+        print(f"  {'✓' if ok else '❌'} {name}")
+    if not all(gates.values()):
+        raise SystemExit(1)
@@ -1,66 +1,68 @@
 # rebuild_qdrant_embeddings.py
-import os
 import json
 import asyncio
-import numpy as np
 import requests
 from dotenv import load_dotenv
 load_dotenv()
 
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
 from sqlalchemy import select
-from src.backend.app.pipeline import extract_embedding
-from src.backend.db_files.models import Person
+from src.backend.app.pipeline import embedding_stages, InvalidImage
+from src.backend.app.services.stages import Stage, StagedPipeline
+from src.backend.app.services.vector_store import person_payload, person_image_payload
+from src.backend.app.services.bulk_writer import BulkWriter
+from src.backend.app.config import STAGE_WORKERS, STAGE_QUEUE_SIZE
+from src.backend.db_files.models import Person, PersonImage
 from src.backend.app.services.db_service import AsyncSessionLocal
 
-QDRANT_URL = os.getenv("QDRANT_URL")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
-
-client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+def download(urls):
+    out = []
+    for url in urls:
+        try:
+            resp = requests.get(url, timeout=10)
+            resp.raise_for_status()
+            out.append(resp.content)
+        except requests.RequestException as e:
+            out.append(e)
+    return out
 
 async def rebuild():
     async with AsyncSessionLocal() as session:
         result = await session.execute(select(Person))
         persons = result.scalars().all()
+        images = (await session.execute(select(PersonImage))).scalars().all()
 
-        print(f"Found {len(persons)} persons to re-embed\n")
+    # (point id, photo url, payload): each person's main photo, then every extra photo
+    by_id = {p.id: p for p in persons}
+    items = [(str(p.id), p.image_url, person_payload(p)) for p in persons]
+    items += [(str(im.id), im.image_url, person_image_payload(by_id[im.person_id], im)) for im in images]
 
-        for p in persons:
-            print("Rebuilding:", p.id)
+    print(f"Found {len(persons)} persons ({len(items)} photos) to re-embed\n")
 
-            # Download image
-            try:
-                resp = requests.get(p.image_url, timeout=10)
-                arr = np.frombuffer(resp.content, np.uint8)
-                import cv2
-                img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-            except Exception as e:
-                print("❌ Failed to load image:", p.image_url)
+    # download -> decode -> detect -> align -> embed, each stage on its own workers
+    stages = [Stage("download", download, STAGE_WORKERS.get("download", 4))] + embedding_stages()
+    # upserts go out in batches on their own threads while embedding continues
+    with StagedPipeline(stages, queue_size=STAGE_QUEUE_SIZE) as staged, BulkWriter() as writer:
+        for i, ((point_id, url, payload), emb) in enumerate(zip(items, staged.map(url for _, url, _ in items)), 1):
+            if isinstance(emb, (requests.RequestException, InvalidImage)):
+                print("❌ Failed to load image:", url)
+                continue
+            if isinstance(emb, Exception):
+                print("❌ Failed to embed:", url, emb)
                 continue
-
-            emb = extract_embedding(img)
             if emb is None:
-                print("❌ No face detected for:", p.image_url)
+                print("❌ No face detected for:", url)
                 continue
 
-            # Upsert into Qdrant
-            client.upsert(
-                collection_name="faces_collection",
-                points=[
-                    models.PointStruct(
-                        id=str(p.id),
-                        vector=emb,
-                        payload={
-                            "person_id": str(p.id),
-                            "verified": True,
-                            "image_url": p.image_url
-                        }
-                    )
-                ]
-            )
+            writer.add(point_id, emb, payload)
+
+            if i % 100 == 0:
+                print(json.dumps({"stages": staged.stats(), "upserts": writer.stats()}, indent=2))
+
+        print(json.dumps(staged.stats(), indent=2))
+
+    print("⬆ Upserts:", json.dumps(writer.stats()))
 
-        print("\n🎉 DONE — All embeddings regenerated & stored successfully!")
+    print("\n🎉 DONE — All embeddings regenerated & stored successfully!")
 
 if __name__ == "__main__":
     asyncio.run(rebuild())
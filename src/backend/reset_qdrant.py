@@ -1,14 +1,18 @@
-from qdrant_client import QdrantClient
 import os
+import shutil
 from dotenv import load_dotenv
 load_dotenv()
 
-client = QdrantClient(
-    url=os.getenv("QDRANT_URL"),
-    api_key=os.getenv("QDRANT_API_KEY")
-)
+from src.backend.app.config import VECTOR_STORE, LOCAL_STORE_PATH
 
-client.delete_collection("faces_collection")
-print("Deleted collection faces_collection")
-collections = client.get_collections()
-print("Available collections:", [c.name for c in collections.collections])
+if VECTOR_STORE == "local":
+    shutil.rmtree(LOCAL_STORE_PATH, ignore_errors=True)
+    print("Deleted local vector store at", LOCAL_STORE_PATH)
+else:
+    from src.backend.app.services.qdrant_service import get_client, COLLECTION
+
+    client = get_client()
+    client.delete_collection(COLLECTION)
+    print("Deleted collection", COLLECTION)
+    collections = client.get_collections()
+    print("Available collections:", [c.name for c in collections.collections])
@@ -0,0 +1,42 @@
+# Per-stage timings of single-stage vs coarse-to-fine face extraction.
+# Run from the project root:
+#   python -m src.backend.test_files.bench_coarse_to_fine path/to/large_photo.jpg [...]
+import sys
+from collections import defaultdict
+import cv2
+from src.backend.app import pipeline
+
+images = [cv2.imread(p) for p in sys.argv[1:]]
+images = [img for img in images if img is not None]
+if not images:
+    print("Pass one or more (large) image paths")
+    raise SystemExit(1)
+
+RUNS = 5
+
+
+def run(two_stage):
+    pipeline.COARSE_TO_FINE = two_stage
+    totals = defaultdict(float)
+    for _ in range(RUNS):
+        for img in images:
+            timings = {}
+            pipeline.extract_face(img, timings)
+            for stage, ms in timings.items():
+                totals[stage] += ms
+    n = RUNS * len(images)
+    return {stage: ms / n for stage, ms in totals.items()}
+
+
+run(False)  # warm-up
+single = run(False)
+coarse = run(True)
+
+print("\nSingle-stage (ms/image):", {k: round(v, 2) for k, v in single.items()})
+print("Coarse-to-fine (ms/image):", {k: round(v, 2) for k, v in coarse.items()})
+
+detect_single = single.get("detect", 0.0)
+detect_coarse = coarse.get("thumbnail", 0.0) + coarse.get("detect_coarse", 0.0) + coarse.get("detect_fine", 0.0)
+print(f"\nDetection stage saved: {detect_single - detect_coarse:.2f} ms/image")
+print(f"Crop stage saved:      {single.get('crop', 0.0) - coarse.get('crop', 0.0):.2f} ms/image")
+print(f"Total saved:           {sum(single.values()) - sum(coarse.values()):.2f} ms/image")
@@ -0,0 +1,62 @@
+# Latency under concurrency for /search.
+#
+# Start the API once per backend and run this against it, e.g.
+#   INFERENCE_BACKEND=inline  uvicorn src.backend.app.main:app --port 7860   (before)
+#   INFERENCE_BACKEND=thread  uvicorn src.backend.app.main:app --port 7860   (after)
+#   INFERENCE_BACKEND=process uvicorn src.backend.app.main:app --port 7860
+# then
+#   python -m src.backend.test_files.bench_concurrency http://localhost:7860 big.jpg small.jpg ...
+#
+# Uploads are salted with a few trailing bytes so the embedding cache never hits.
+import sys
+import time
+import asyncio
+import aiohttp
+import numpy as np
+
+CONCURRENCY = [1, 4, 16, 32]
+REQUESTS_PER_LEVEL = 64
+
+
+async def one_request(session, url, img_bytes, salt):
+    data = aiohttp.FormData()
+    data.add_field("file", img_bytes + salt.to_bytes(8, "little"), filename="query.jpg", content_type="image/jpeg")
+    t0 = time.perf_counter()
+    async with session.post(f"{url}/search", data=data) as resp:
+        await resp.read()
+        status = resp.status
+    return (time.perf_counter() - t0) * 1000, status
+
+
+async def run_level(url, images, concurrency, salt_base):
+    sem = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300)) as session:
+        async def bounded(i):
+            async with sem:
+                return await one_request(session, url, images[i % len(images)], salt_base + i)
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*[bounded(i) for i in range(REQUESTS_PER_LEVEL)])
+        wall = time.perf_counter() - t0
+
+    lat = np.array([ms for ms, _ in results])
+    errors = sum(status >= 500 for _, status in results)
+    print(f"{concurrency:>5} {REQUESTS_PER_LEVEL / wall:>8.1f} {np.percentile(lat, 50):>9.1f} "
+          f"{np.percentile(lat, 95):>9.1f} {np.percentile(lat, 99):>9.1f} {errors:>7}")
+
+
+async def main():
+    if len(sys.argv) < 3:
+        print("Usage: python -m src.backend.test_files.bench_concurrency <base_url> <image> [image ...]")
+        raise SystemExit(1)
+    url = sys.argv[1].rstrip("/")
+    images = [open(p, "rb").read() for p in sys.argv[2:]]
+
+    salt_base = time.time_ns()
+    print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'5xx':>7}")
+    for level, concurrency in enumerate(CONCURRENCY):
+        await run_level(url, images, concurrency, salt_base + level * REQUESTS_PER_LEVEL)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+# Latency / recall of the detector at each input size.
+# Run from the project root:
+#   python -m src.backend.test_files.bench_detector_sizes [image_dir]
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from src.backend.app.config import DETECTOR_INPUT_SIZES
+from src.backend.app.services.detector import detect_faces, choose_input_size
+
+IMAGE_DIR = sys.argv[1] if len(sys.argv) > 1 else "data/processed"
+MAX_IMAGES = 200
+
+files = sorted(f for f in os.listdir(IMAGE_DIR) if f.lower().endswith((".jpg", ".jpeg", ".png")))[:MAX_IMAGES]
+images = [cv2.imread(os.path.join(IMAGE_DIR, f)) for f in files]
+images = [img for img in images if img is not None]
+print(f"Loaded {len(images)} images from {IMAGE_DIR}\n")
+
+# warm up every size so session/anchor setup isn't timed
+for size in DETECTOR_INPUT_SIZES:
+    detect_faces(images[0], score_thresh=0.3, size=size)
+
+print(f"{'size':>6} {'mean ms':>9} {'p95 ms':>9} {'recall':>8}")
+for size in DETECTOR_INPUT_SIZES:
+    latencies = []
+    found = 0
+    for img in images:
+        t0 = time.perf_counter()
+        dets = detect_faces(img, score_thresh=0.3, size=size)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found += bool(dets)
+    lat = np.array(latencies)
+    # every image in the dataset holds exactly one face
+    print(f"{size:>6} {lat.mean():>9.2f} {np.percentile(lat, 95):>9.2f} {found / len(images):>8.3f}")
+
+chosen = [choose_input_size(img.shape) for img in images]
+print("\nPolicy picks:", {s: chosen.count(s) for s in sorted(set(chosen))})
@@ -0,0 +1,40 @@
+# Full vs reduced-resolution JPEG decode, and end-to-end embedding from bytes.
+# Run from the project root:
+#   python -m src.backend.test_files.bench_reduced_decode path/to/phone_photo.jpg [...]
+import sys
+import time
+import numpy as np
+import cv2
+from src.backend.app import pipeline
+from src.backend.app.services.image_io import REDUCED_FLAGS, jpeg_size, reduction_factor
+from src.backend.app.config import REDUCED_DECODE_MIN_SIDE
+
+blobs = [open(p, "rb").read() for p in sys.argv[1:]]
+if not blobs:
+    print("Pass one or more (large) JPEG paths")
+    raise SystemExit(1)
+
+RUNS = 5
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    for _ in range(RUNS):
+        out = fn()
+    return (time.perf_counter() - t0) / RUNS * 1000, out
+
+
+for path, b in zip(sys.argv[1:], blobs):
+    factor = reduction_factor(b, REDUCED_DECODE_MIN_SIDE)
+    full_ms, full = timed(lambda: cv2.imdecode(np.frombuffer(b, np.uint8), cv2.IMREAD_COLOR))
+    line = f"{path}: {jpeg_size(b)} full {full_ms:.1f} ms / {full.nbytes / 1e6:.1f} MB"
+    if factor > 1:
+        red_ms, red = timed(lambda: cv2.imdecode(np.frombuffer(b, np.uint8), REDUCED_FLAGS[factor]))
+        line += f" | 1/{factor} {red_ms:.1f} ms / {red.nbytes / 1e6:.1f} MB"
+    print(line)
+
+pipeline.warmup()
+for reduced in (False, True):
+    pipeline.REDUCED_DECODE = reduced
+    ms, _ = timed(lambda: [pipeline.embed_image_bytes(b) for b in blobs])
+    print(f"embed_image_bytes, reduced decode {'on ' if reduced else 'off'}: {ms / len(blobs):.1f} ms/image")
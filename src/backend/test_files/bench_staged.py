@@ -0,0 +1,53 @@
+# Throughput of the sequential embed loop vs the staged pipeline.
+# Run from the project root:
+#   python -m src.backend.test_files.bench_staged path/to/photos/*.jpg [--search]
+# --search adds a vector search stage against the configured VECTOR_STORE.
+# Tune stages with STAGE_WORKERS, STAGE_BATCH_SIZE and STAGE_QUEUE_SIZE.
+import sys
+import json
+import time
+from src.backend.app import pipeline
+from src.backend.app.services.stages import StagedPipeline
+from src.backend.app.config import STAGE_QUEUE_SIZE
+
+args = [a for a in sys.argv[1:] if not a.startswith("--")]
+with_search = "--search" in sys.argv
+blobs = [open(p, "rb").read() for p in args]
+if not blobs:
+    print("Pass one or more image paths")
+    raise SystemExit(1)
+
+ROUNDS = 4
+items = blobs * ROUNDS
+
+if with_search:
+    from src.backend.app.services.vector_store import search_vectors
+    # (bytes, filters) items, as /search submits them
+    stages = pipeline.search_stages(top_k=5, group_by=None)
+    staged_items = [(b, None) for b in items]
+else:
+    stages = pipeline.embedding_stages()
+    staged_items = items
+
+pipeline.warmup()
+
+t0 = time.perf_counter()
+for b in items:
+    try:
+        emb = pipeline.embed_image_bytes(b)
+        if with_search and emb is not None:
+            search_vectors(emb, top_k=5)
+    except pipeline.InvalidImage:
+        pass
+sequential = time.perf_counter() - t0
+
+with StagedPipeline(stages, queue_size=STAGE_QUEUE_SIZE) as staged:
+    t0 = time.perf_counter()
+    results = list(staged.map(staged_items))
+    parallel = time.perf_counter() - t0
+    stats = staged.stats()
+
+print(f"\nSequential: {len(items) / sequential:.1f} images/s")
+print(f"Staged:     {len(items) / parallel:.1f} images/s ({sequential / parallel:.2f}x)")
+print(f"Faces found: {sum(isinstance(r, (list, tuple)) for r in results)}/{len(results)}")
+print(json.dumps(stats, indent=2))
@@ -0,0 +1,51 @@
+# Search latency of the local vector store (exact vs IVF) on a synthetic gallery,
+# plus IVF recall against exact search.
+# Run from the project root:
+#   python -m src.backend.test_files.bench_vector_store [num_points]
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+from src.backend.app.services.local_store import LocalStore
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+DIM, QUERIES, TOP_K = 512, 200, 5
+
+rng = np.random.default_rng(0)
+# clustered data: a few "identities" worth of structure, like a real gallery
+centers = rng.standard_normal((N // 20, DIM)).astype(np.float32)
+path = tempfile.mkdtemp(prefix="bench_store_")
+try:
+    store = LocalStore(path, dim=DIM, index="flat")
+    t0 = time.perf_counter()
+    for start in range(0, N, 10_000):
+        ids = np.arange(start, min(N, start + 10_000))
+        vecs = centers[ids % len(centers)] + 0.5 * rng.standard_normal((len(ids), DIM)).astype(np.float32)
+        store.upsert((int(i), v, {"verified": bool(i % 10), "person_id": str(i)}) for i, v in zip(ids, vecs))
+    print(f"Inserted {N} points in {time.perf_counter() - t0:.1f}s")
+
+    queries = centers[rng.integers(0, len(centers), QUERIES)] + 0.5 * rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+
+    def bench(label, s):
+        s.search(queries[0], TOP_K, {"verified": True})  # warm filter mask
+        t0 = time.perf_counter()
+        results = [s.search(q, TOP_K, {"verified": True}) for q in queries]
+        single = (time.perf_counter() - t0) / QUERIES * 1000
+        t0 = time.perf_counter()
+        s.search_batch(queries, TOP_K, {"verified": True})
+        batch = (time.perf_counter() - t0) / QUERIES * 1000
+        print(f"{label:<8} {single:8.3f} ms/query   batched {batch:8.3f} ms/query")
+        return [[h.id for h in r] for r in results]
+
+    exact = bench("exact", store)
+
+    ivf = LocalStore(path, dim=DIM, index="ivf", nlist=int(np.sqrt(N) * 2), nprobe=16)
+    t0 = time.perf_counter()
+    ivf.build_index()
+    print(f"IVF build {time.perf_counter() - t0:.1f}s")
+    approx = bench("ivf", ivf)
+    recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact) if e])
+    print(f"IVF recall@{TOP_K}: {recall:.3f}")
+finally:
+    shutil.rmtree(path)
@@ -0,0 +1,99 @@
+# MicroBatcher and StagedPipeline must hand every caller its own item's
+# result, and an item's failure only to that item's caller.
+# Run from the project root:
+#   python -m src.backend.test_files.test_batching
+import time
+import asyncio
+from src.backend.app.services.batcher import MicroBatcher
+from src.backend.app.services.stages import Stage, StagedPipeline
+
+
+def _square(items):
+    # module level so it also runs with INFERENCE_BACKEND=process
+    out = []
+    for x in items:
+        out.append(ValueError(f"bad item {x}") if x % 7 == 3 else (x * x, len(items)))
+    return out
+
+
+def _explode(items):
+    raise RuntimeError("model crashed")
+
+
+def test_micro_batcher_results():
+    async def main():
+        batcher = MicroBatcher(_square, max_batch=8, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.submit(x) for x in range(30)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    for x, result in enumerate(results):
+        if x % 7 == 3:
+            assert isinstance(result, ValueError) and str(result) == f"bad item {x}"
+        else:
+            assert result[0] == x * x
+            assert 1 <= result[1] <= 8
+    # concurrent callers were actually batched together
+    assert max(r[1] for r in results if not isinstance(r, Exception)) == 8
+
+
+def test_micro_batcher_whole_batch_failure():
+    async def main():
+        batcher = MicroBatcher(_explode, max_batch=4, max_wait_ms=5)
+        results = await asyncio.gather(*(batcher.submit(x) for x in range(6)), return_exceptions=True)
+        # the batcher keeps working after a failed batch
+        batcher.fn = _square
+        return results, await batcher.submit(5)
+
+    results, after = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert after == (25, 1)
+
+
+def _parse(items):
+    return [int(s) if s.strip().lstrip("-").isdigit() else ValueError(f"not a number: {s!r}") for s in items]
+
+
+def _skip_negative(items):
+    return [None if x < 0 else x for x in items]
+
+
+def _slow_double(items):
+    # later items finish first so results can't line up by accident
+    time.sleep(0.001 * (len(items) % 3))
+    return [x * 2 for x in items]
+
+
+def test_staged_pipeline_results():
+    items = [str(i) for i in range(50)] + ["x", "-4", " 7 "]
+    stages = [
+        Stage("parse", _parse, workers=2, batch_size=4),
+        Stage("filter", _skip_negative),
+        Stage("double", _slow_double, workers=3, batch_size=2),
+    ]
+    with StagedPipeline(stages, queue_size=4) as pipeline:
+        results = list(pipeline.map(items))
+        future = pipeline.submit("21")
+        assert future.result(timeout=5) == 42
+
+    assert results[:50] == [i * 2 for i in range(50)]
+    assert isinstance(results[50], ValueError) and "'x'" in str(results[50])
+    assert results[51] is None
+    assert results[52] == 14
+
+    stats = pipeline.stats()
+    assert [s["items"] for s in stats["stages"]] == [54, 53, 52]
+
+
+def test_staged_pipeline_stage_failure():
+    with StagedPipeline([Stage("parse", _parse), Stage("boom", _explode, batch_size=8)]) as pipeline:
+        results = list(pipeline.map(["1", "y", "2"]))
+    assert isinstance(results[0], RuntimeError) and isinstance(results[2], RuntimeError)
+    assert isinstance(results[1], ValueError)
+
+
+if __name__ == "__main__":
+    test_micro_batcher_results()
+    test_micro_batcher_whole_batch_failure()
+    test_staged_pipeline_results()
+    test_staged_pipeline_stage_failure()
+    print("✅ Batched callers get their own results and errors")
@@ -0,0 +1,76 @@
+# BulkWriter: batches at the size threshold, flushes the rest on close and
+# retries upserts that fail.
+# Run from the project root:
+#   python -m src.backend.test_files.test_bulk_writer
+import time
+import threading
+from src.backend.app.services.bulk_writer import BulkWriter, upsert_with_retry
+
+
+class FakeStore:
+    # records every upsert; the first `failures` calls raise
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def upsert(self, points, wait=True):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise ConnectionError("qdrant unavailable")
+            self.batches.append([pid for pid, _, _ in points])
+
+
+def test_flush_at_threshold_and_close():
+    store = FakeStore()
+    writer = BulkWriter(store, batch_size=4, parallel=2, retries=0, backoff=0)
+    for i in range(10):
+        writer.add(i, [0.0], {"person_id": str(i)})
+    # two full batches go out on their own, before close()
+    deadline = time.monotonic() + 5
+    while len(store.batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(map(len, store.batches)) == [4, 4]
+    writer.close()
+    assert sorted(map(len, store.batches)) == [2, 4, 4]
+    assert sorted(pid for batch in store.batches for pid in batch) == list(range(10))
+
+    store = FakeStore()
+    with BulkWriter(store, batch_size=4, parallel=1, retries=0, backoff=0) as writer:
+        for i in range(6):
+            writer.add(i, [0.0], {})
+    assert store.batches == [[0, 1, 2, 3], [4, 5]]
+    assert writer.stats()["written"] == 6 and writer.stats()["batches"] == 2
+
+
+def test_retries_failing_upsert():
+    store = FakeStore(failures=2)
+    assert upsert_with_retry(store, [(1, [0.0], {})], retries=3, backoff=0) == 2
+    assert store.batches == [[1]]
+
+    store = FakeStore(failures=1)
+    with BulkWriter(store, batch_size=3, parallel=1, retries=2, backoff=0) as writer:
+        for i in range(3):
+            writer.add(i, [0.0], {})
+    stats = writer.stats()
+    assert store.batches == [[0, 1, 2]]
+    assert stats["written"] == 3 and stats["retries"] == 1 and stats["failed"] == 0
+
+
+def test_gives_up_after_retries():
+    # a batch that keeps failing is counted, not raised
+    store = FakeStore(failures=10)
+    with BulkWriter(store, batch_size=2, parallel=1, retries=2, backoff=0) as writer:
+        for i in range(2):
+            writer.add(i, [0.0], {})
+    assert store.calls == 3
+    assert writer.stats()["failed"] == 2 and writer.stats()["written"] == 0
+
+
+if __name__ == "__main__":
+    test_flush_at_threshold_and_close()
+    test_retries_failing_upsert()
+    test_gives_up_after_retries()
+    print("✅ BulkWriter batches, flushes and retries")
@@ -3,7 +3,7 @@ import cv2
 import numpy as np
 import requests
 from src.backend.app.pipeline import extract_embedding
-from src.backend.app.services.qdrant_service import search_vectors
+from src.backend.app.services.vector_store import search_vectors
 
 # Download test image
 test_image_url = "https://res.cloudinary.com/dn9fmgufm/image/upload/v1764487688/jntvkjkkhtr0rub9dpmf.jpg"
@@ -0,0 +1,27 @@
+# Detector input size selection (no model needed).
+# Run from the project root:
+#   python -m src.backend.test_files.test_detector_input_size
+from src.backend.app.services.detector import choose_input_size
+
+
+def test_large_frames_keep_640():
+    # a 5% face in a 1080p CCTV frame must still span 32 px after resizing
+    assert choose_input_size((1080, 1920, 3)) == 640
+    assert choose_input_size((3024, 4032, 3)) == 640
+
+
+def test_small_images_are_not_upscaled():
+    assert choose_input_size((240, 300, 3)) == 320
+    assert choose_input_size((300, 400, 3)) == 480
+
+
+def test_smaller_faces_need_larger_inputs():
+    assert choose_input_size((1080, 1920, 3), min_face_ratio=0.1) == 320
+    assert choose_input_size((1080, 1920, 3), min_face_ratio=0.03) == 960
+
+
+if __name__ == "__main__":
+    test_large_frames_keep_640()
+    test_small_images_are_not_upscaled()
+    test_smaller_faces_need_larger_inputs()
+    print("✅ Detector input sizes OK")
@@ -0,0 +1,45 @@
+# Pipeline exceptions must survive a pickle round trip: with
+# INFERENCE_BACKEND=process they are raised in a worker and re-raised here.
+# Run from the project root:
+#   python -m src.backend.test_files.test_exceptions
+import pickle
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from src.backend.app.services.quality import QualityRejected
+from src.backend.app.services.image_io import InvalidImage
+
+
+def test_quality_rejected_pickles():
+    detail = {"reason": "too_blurry", "metric": "sharpness", "value": 12.5, "threshold": 40.0}
+    e = pickle.loads(pickle.dumps(QualityRejected(detail)))
+    assert isinstance(e, QualityRejected)
+    assert e.detail == detail
+    assert str(e) == "too_blurry"
+
+
+def test_invalid_image_pickles():
+    e = pickle.loads(pickle.dumps(InvalidImage("Invalid image file")))
+    assert isinstance(e, InvalidImage)
+    assert str(e) == "Invalid image file"
+
+
+def _reject():
+    raise QualityRejected({"reason": "face_too_small", "metric": "face_px", "value": 20, "threshold": 40})
+
+
+def test_rejection_from_worker_process():
+    # the pool must stay usable after a worker raises
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            pool.submit(_reject).result()
+            raise AssertionError("expected QualityRejected")
+        except QualityRejected as e:
+            assert e.detail["reason"] == "face_too_small"
+        assert pool.submit(int, "7").result() == 7
+
+
+if __name__ == "__main__":
+    test_quality_rejected_pickles()
+    test_invalid_image_pickles()
+    test_rejection_from_worker_process()
+    print("✅ Pipeline exceptions pickle cleanly")
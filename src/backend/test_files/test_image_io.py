@@ -0,0 +1,43 @@
+# JPEG header parsing and reduced-scale decoding in image_io.
+# Run from the project root:
+#   python -m src.backend.test_files.test_image_io
+import cv2
+import numpy as np
+from src.backend.app.services.image_io import jpeg_size, reduction_factor, decode_image_reduced
+
+
+def _encode(width, height, ext=".jpg", params=()):
+    img = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(ext, img, list(params))
+    assert ok
+    return buf.tobytes()
+
+
+def test_jpeg_size():
+    assert jpeg_size(_encode(1920, 1080)) == (1920, 1080)
+    assert jpeg_size(_encode(37, 501)) == (37, 501)
+    assert jpeg_size(_encode(640, 480, params=(cv2.IMWRITE_JPEG_PROGRESSIVE, 1))) == (640, 480)
+    assert jpeg_size(_encode(64, 64, ".png")) is None
+    assert jpeg_size(b"") is None
+    assert jpeg_size(b"\xff\xd8\xff\xe0\x00") is None  # truncated header
+
+
+def test_decode_reduced():
+    big = _encode(2400, 1600)
+    assert reduction_factor(big, 640) == 2
+    assert reduction_factor(big, 300) == 8
+    img, factor = decode_image_reduced(big, 640)
+    assert factor == 2 and img.shape == (800, 1200, 3)
+
+    # small JPEGs and other formats decode at full size
+    img, factor = decode_image_reduced(_encode(800, 600), 640)
+    assert factor == 1 and img.shape == (600, 800, 3)
+    img, factor = decode_image_reduced(_encode(2400, 1600, ".png"), 640)
+    assert factor == 1 and img.shape == (1600, 2400, 3)
+    assert decode_image_reduced(b"not an image", 640) == (None, 1)
+
+
+if __name__ == "__main__":
+    test_jpeg_size()
+    test_decode_reduced()
+    print("✅ JPEG headers and reduced decoding behave")
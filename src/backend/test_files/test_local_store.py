@@ -0,0 +1,138 @@
+# Behaviour of the local vector store: IVF recall against exact search,
+# payload filters and writes surviving a reload, delete/scroll/count.
+# Run from the project root:
+#   python -m src.backend.test_files.test_local_store
+import shutil
+import tempfile
+import numpy as np
+from src.backend.app.services.local_store import LocalStore
+
+DIM = 64
+
+
+def _gallery(n, seed=0):
+    # clustered vectors, like several photos of each person
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n // 10, DIM)).astype(np.float32)
+    vecs = centers[np.arange(n) % len(centers)] + 0.5 * rng.standard_normal((n, DIM)).astype(np.float32)
+    queries = centers[rng.integers(0, len(centers), 50)] + 0.5 * rng.standard_normal((50, DIM)).astype(np.float32)
+    return vecs, queries
+
+
+def _ids(hits):
+    return [h.id for h in hits]
+
+
+def test_ivf_recall():
+    vecs, queries = _gallery(4000)
+    flat_dir, ivf_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        flat = LocalStore(flat_dir, dim=DIM, index="flat")
+        ivf = LocalStore(ivf_dir, dim=DIM, index="ivf", nlist=16, nprobe=4)
+        points = [(i, v, {"person_id": str(i // 10)}) for i, v in enumerate(vecs)]
+        flat.upsert(points)
+        ivf.upsert(points)
+        ivf.build_index()
+
+        exact = [set(_ids(r)) for r in flat.search_batch(queries, top_k=5)]
+        approx = [set(_ids(r)) for r in ivf.search_batch(queries, top_k=5)]
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approx, exact)])
+        assert recall >= 0.9, recall
+
+        # probing every list is exact search
+        ivf.nprobe = 16
+        assert [set(_ids(r)) for r in ivf.search_batch(queries, top_k=5)] == exact
+
+        # re-upserting indexed ids (as a rebuild does) must not return them twice,
+        # including a point moved to another list and back
+        ivf.upsert(points)
+        ivf.upsert([(0, queries[1], {}), (0, vecs[0], {"person_id": "0"})])
+        for hits in ivf.search_batch(queries, top_k=10):
+            ids = _ids(hits)
+            assert len(ids) == len(set(ids)), ids
+        assert [set(_ids(r)) for r in ivf.search_batch(queries, top_k=5)] == exact
+
+        # points written after the build are still found, also after a reload
+        ivf.upsert([("late", queries[0], {"person_id": "late"})])
+        assert ivf.search(queries[0], top_k=1)[0].id == "late"
+        reopened = LocalStore(ivf_dir, dim=DIM, index="ivf", nlist=16, nprobe=4)
+        assert reopened._centroids is not None
+        assert reopened.search(queries[0], top_k=1)[0].id == "late"
+    finally:
+        shutil.rmtree(flat_dir)
+        shutil.rmtree(ivf_dir)
+
+
+def test_filters_survive_reload():
+    vecs, queries = _gallery(200, seed=1)
+    path = tempfile.mkdtemp()
+    try:
+        store = LocalStore(path, dim=DIM)
+        store.upsert(
+            (i, v, {"person_id": str(i // 10), "verified": i % 2 == 0, "age": i % 60, "name": f"Person {i} Kumar"})
+            for i, v in enumerate(vecs)
+        )
+        store.set_payload({"verified": True}, {"person_id": "3"})
+
+        conditions = [
+            {"verified": True},
+            {"person_id": ["3", "4"]},
+            {"age": {"gte": 20, "lt": 30}},
+            {"name": {"text": "person 7"}},
+            {"verified": False, "person_id": "5"},
+        ]
+        before = [(store.count(c), _ids(store.search(queries[0], 10, c))) for c in conditions]
+
+        reopened = LocalStore(path, dim=DIM)
+        after = [(reopened.count(c), _ids(reopened.search(queries[0], 10, c))) for c in conditions]
+        assert after == before
+
+        # person 3 had five unverified photos; set_payload made all ten verified
+        assert reopened.count({"person_id": "3", "verified": True}) == 10
+        assert before[0][0] == 105
+        for hit in reopened.search(queries[0], 10, {"age": {"gte": 20, "lt": 30}}):
+            assert 20 <= hit.payload["age"] < 30
+    finally:
+        shutil.rmtree(path)
+
+
+def test_delete_scroll_count():
+    vecs, _ = _gallery(250, seed=2)
+    path = tempfile.mkdtemp()
+    try:
+        store = LocalStore(path, dim=DIM)
+        store.upsert((i, v, {"person_id": str(i // 10)}) for i, v in enumerate(vecs))
+        store.delete([str(i) for i in range(0, 250, 5)] + ["missing"])
+        assert store.count() == 200
+        assert store.count({"person_id": "0"}) == 8
+
+        def scroll_all(s):
+            ids, offset = [], None
+            while True:
+                page, offset = s.scroll(limit=64, offset=offset)
+                ids += _ids(page)
+                if offset is None:
+                    return ids
+
+        expected = [str(i) for i in range(250) if i % 5]
+        assert scroll_all(store) == expected
+
+        page, _ = store.scroll(limit=1, with_vectors=True)
+        assert len(page[0].vector) == DIM
+
+        # deletes are in the log; compact() drops the rows but keeps the points
+        reopened = LocalStore(path, dim=DIM)
+        assert reopened.count() == 200 and scroll_all(reopened) == expected
+        reopened.compact()
+        assert reopened.count() == 200 and sorted(scroll_all(reopened), key=int) == expected
+        assert reopened.search(vecs[1], top_k=1)[0].id == "1"
+        assert all(h.id != "0" for h in reopened.search(vecs[0], top_k=5))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    test_ivf_recall()
+    test_filters_survive_reload()
+    test_delete_scroll_count()
+    print("✅ LocalStore search, filters and persistence behave")
@@ -0,0 +1,30 @@
+# Every NMS method must collapse overlapping detections of one face.
+# Run from the project root:
+#   python -m src.backend.test_files.test_nms
+import numpy as np
+from src.backend.app.services.nms import run_nms
+
+# three shifted boxes on one face, one separate face
+BOXES = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [10, 10, 110, 110], [300, 300, 400, 400]], np.float32)
+SCORES = np.array([0.9, 0.85, 0.8, 0.5], np.float32)
+
+
+def test_methods_agree():
+    for method in ("hard", "numpy", "soft"):
+        keep, scores = run_nms(BOXES, SCORES, 0.4, method=method)
+        assert list(keep) == [0, 3], (method, keep)
+        assert np.allclose(scores, [0.9, 0.5]), (method, scores)
+
+
+def test_soft_nms_drops_below_detection_threshold():
+    # duplicates decay to ~0.32 and ~0.06: kept with a tiny floor, dropped at 0.4
+    keep, _ = run_nms(BOXES, SCORES, 0.001, method="soft")
+    assert sorted(keep) == [0, 1, 2, 3]
+    keep, scores = run_nms(BOXES, SCORES, 0.4, method="soft")
+    assert list(keep) == [0, 3] and scores.min() >= 0.4
+
+
+if __name__ == "__main__":
+    test_methods_agree()
+    test_soft_nms_drops_below_detection_threshold()
+    print("✅ NMS methods collapse duplicate faces")
@@ -0,0 +1,53 @@
+# Splitting an MJPEG upload into frames must follow the JPEG markers, not
+# stop at the first EOI (an EXIF thumbnail carries its own).
+# Run from the project root:
+#   python -m src.backend.test_files.test_video_stream
+import struct
+import cv2
+import numpy as np
+from src.backend.app.services.video import split_jpeg_stream
+
+
+def _encode(width, height, seed, params=()):
+    img = np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", img, list(params))
+    assert ok
+    return buf.tobytes()
+
+
+def _with_thumbnail(jpeg, thumbnail):
+    # camera-style frame: an APP1 (EXIF) segment holding a complete JPEG right after SOI
+    body = b"Exif\x00\x00" + thumbnail
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(body) + 2) + body + jpeg[2:]
+
+
+def test_frames_with_thumbnails():
+    thumb = _encode(32, 24, seed=9)
+    frames = [
+        _with_thumbnail(_encode(320, 240, seed=0), thumb),
+        _encode(320, 240, seed=1),
+        _with_thumbnail(_encode(320, 240, seed=2, params=(cv2.IMWRITE_JPEG_PROGRESSIVE, 1)), thumb),
+        _encode(320, 240, seed=3, params=(cv2.IMWRITE_JPEG_RST_INTERVAL, 4)),
+    ]
+    # some cameras put junk between frames
+    stream = b"\r\n--frame\r\n".join(frames)
+
+    split = split_jpeg_stream(stream)
+    assert split == frames
+    for blob in split:
+        img = cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR)
+        assert img is not None and img.shape == (240, 320, 3)
+
+
+def test_truncated_tail():
+    frames = [_encode(64, 48, seed=4), _with_thumbnail(_encode(64, 48, seed=5), _encode(16, 16, seed=6))]
+    stream = b"".join(frames)
+    assert split_jpeg_stream(stream[:-1]) == frames[:1]
+    assert split_jpeg_stream(stream[:len(frames[0]) + 40]) == frames[:1]
+    assert split_jpeg_stream(b"no frames here") == []
+
+
+if __name__ == "__main__":
+    test_frames_with_thumbnails()
+    test_truncated_tail()
+    print("✅ MJPEG streams split on the right frame boundaries")